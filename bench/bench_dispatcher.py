@@ -0,0 +1,222 @@
+"""
+Offline dispatcher throughput benchmark.
+
+Builds synthetic Telethon NewMessage events against a stub client that
+records edit/reply calls, loads the real plugins, and drives
+Dispatcher.user_handler / bot_handler / _handle without any Telegram
+connection.
+
+Usage:
+    python bench/bench_dispatcher.py [-n 5000] [--only plain,command]
+"""
+
+import argparse
+import asyncio
+import atexit
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+_TMP = tempfile.TemporaryDirectory(prefix="atlas_bench_")
+TMP = Path(_TMP.name)
+# Registered before db.core is imported, so it runs after the DB closes
+atexit.register(_TMP.cleanup)
+
+# Fake credentials before config is imported; nothing connects
+os.environ.update(
+    API_ID="1",
+    API_HASH="bench",
+    OWNER_ID="1000",
+    RUN_MODE="dual",
+    STRING_SESSION="bench",
+    BOT_TOKEN="bench",
+    DB_FILE=str(TMP / "bench.db"),
+    PLUGIN_PATH="plugins",
+)
+
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+from telethon.events import NewMessage  # noqa: E402
+from telethon.tl import types  # noqa: E402
+from telethon.tl.custom.message import Message  # noqa: E402
+
+from config import config  # noqa: E402
+from utils.logger import log  # noqa: E402
+
+OWNER_ID = config.OWNER_ID
+SELF_ID = OWNER_ID
+BOT_ID = 2000
+PEER_ID = 3000
+
+
+# -------------------------------------------------
+# Stub client
+# -------------------------------------------------
+class _NoCache:
+    def get(self, _):
+        return None
+
+
+class StubClient:
+    """
+    Just enough of TelegramClient for the dispatcher and the hot plugins.
+    Every API call is recorded instead of sent.
+    """
+
+    def __init__(self, self_id: int):
+        self._self_id = self_id
+        self._mb_entity_cache = _NoCache()
+        self.parse_mode = None
+        self.calls = {}
+        self._ids = 10_000_000
+
+    def _record(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def _message(self, text="", peer=PEER_ID, out=True):
+        self._ids += 1
+        return build_message(self, self._ids, text, peer, out=out)
+
+    async def edit_message(self, entity, message, text=None, **kwargs):
+        self._record("edit")
+        return self._message(text or "")
+
+    async def send_message(self, entity, message="", **kwargs):
+        self._record("reply" if kwargs.get("reply_to") else "send")
+        return self._message(message)
+
+    async def send_file(self, entity, file, **kwargs):
+        self._record("send_file")
+        return self._message(kwargs.get("caption") or "")
+
+    async def forward_messages(self, entity, messages, from_peer=None, **kwargs):
+        self._record("forward")
+        return self._message("", out=False)
+
+    async def delete_messages(self, entity, message_ids, **kwargs):
+        self._record("delete")
+
+    async def get_messages(self, entity, ids=None, **kwargs):
+        self._record("get_messages")
+        return self._message("the quick brown fox", out=False)
+
+    async def iter_messages(self, entity, limit=None, **kwargs):
+        self._record("iter_messages")
+        for _ in range(limit or 1):
+            yield self._message("the quick brown fox", out=False)
+
+
+# -------------------------------------------------
+# Synthetic events
+# -------------------------------------------------
+def build_message(client, msg_id, text, peer, out=True, sender=None, reply_to=None):
+    message = Message(
+        id=msg_id,
+        peer_id=types.PeerUser(peer),
+        date=None,
+        message=text,
+        out=out,
+        from_id=types.PeerUser(sender) if sender else None,
+        reply_to=types.MessageReplyHeader(reply_to_msg_id=reply_to)
+        if reply_to
+        else None,
+    )
+    user = types.User(id=peer, access_hash=peer)
+    message._finish_init(client, {peer: user}, None)
+    return message
+
+
+def build_event(client, msg_id, text, peer=PEER_ID, out=True, sender=None, reply_to=None):
+    message = build_message(client, msg_id, text, peer, out, sender, reply_to)
+    event = NewMessage.Event(message)
+    event._entities[peer] = types.User(id=peer, access_hash=peer)
+    event._set_client(client)
+    return event
+
+
+# -------------------------------------------------
+# Scenarios
+# -------------------------------------------------
+def scenarios(dispatcher, user, bot):
+    def outgoing(text, reply_to=None):
+        return lambda i: build_event(user, i, text, reply_to=reply_to)
+
+    def assistant_pm(i):
+        # Distinct senders so the rate limiter does not short-circuit
+        sender = 100_000 + i
+        return build_event(
+            bot, i, "hello assistant", peer=sender, out=False, sender=sender
+        )
+
+    return {
+        "plain": (dispatcher.user_handler, outgoing("just chatting about the weekend")),
+        "command": (dispatcher.user_handler, outgoing(".ping")),
+        "dispatch": (lambda e: dispatcher._handle(e, "."), outgoing(".ping")),
+        "unknown": (dispatcher.user_handler, outgoing(".notacommand x y")),
+        "sed": (dispatcher.user_handler, outgoing("s/quick/slow/g", reply_to=1)),
+        "assistant-pm": (dispatcher.bot_handler, assistant_pm),
+    }
+
+
+async def run_scenario(dispatcher, entry, factory, n: int):
+    events = [factory(i + 1) for i in range(n)]
+
+    start = time.perf_counter()
+    for event in events:
+        await entry(event)
+
+    # Commands run as tasks; include them until they finish
+    while dispatcher.jobs:
+        await asyncio.gather(
+            *(job.task for job in list(dispatcher.jobs.values())),
+            return_exceptions=True,
+        )
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", type=int, default=5000, help="messages per scenario")
+    parser.add_argument("--only", default="", help="comma-separated scenario names")
+    opts = parser.parse_args()
+
+    # Keep plugin/loader chatter out of the numbers
+    log.setLevel("WARNING")
+
+    from dispatcher import dispatcher
+    from loader import loader
+
+    load_start = time.perf_counter()
+    loader.load()
+    load_time = time.perf_counter() - load_start
+
+    user = StubClient(SELF_ID)
+    bot = StubClient(BOT_ID)
+
+    wanted = {s for s in opts.only.split(",") if s}
+    results = []
+
+    for name, (entry, factory) in scenarios(dispatcher, user, bot).items():
+        if wanted and name not in wanted:
+            continue
+
+        # Warm up caches / lazy paths first
+        await run_scenario(dispatcher, entry, factory, min(100, opts.n))
+        elapsed = await run_scenario(dispatcher, entry, factory, opts.n)
+        results.append((name, opts.n / elapsed, elapsed / opts.n * 1e6))
+
+    print(f"\nplugins: {len(loader.plugins)} loaded in {load_time * 1000:.0f} ms")
+    print(f"raw prefilter: {dispatcher.raw_stats}")
+    print(f"stub calls: user={user.calls} bot={bot.calls}\n")
+
+    print(f"{'scenario':<14}{'msg/s':>12}{'us/msg':>12}")
+    for name, rate, per_msg in results:
+        print(f"{name:<14}{rate:>12,.0f}{per_msg:>12.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,48 +1,160 @@
-from telethon import TelegramClient
-from telethon.sessions import StringSession
+import asyncio
+import time
 
+from telethon import TelegramClient
+from telethon.errors import FloodWaitError, RPCError
 from config import config
-from utils.logger import log
+from db.session import AtlasSession
+from utils.logger import log, log_event
+from utils.profiler import profiler
 
 
 class Clients:
     def __init__(self):
         self.user: TelegramClient | None = None
         self.bot: TelegramClient | None = None
+        self.stats = {}  # "user" / "bot" -> {"ms", "attempts", "error"}
 
     async def start(self):
         """
         Start user and/or bot clients depending on config.
+        Both connect concurrently; one failing does not stop the other.
         """
+        jobs = {}
 
         # ---------------- Userbot ----------------
         if config.STRING_SESSION:
-            log.info("Starting userbot")
-            self.user = TelegramClient(
-                StringSession(config.STRING_SESSION),
-                config.API_ID,
-                config.API_HASH,
+            jobs["user"] = self._start_client(
+                "user",
+                lambda: TelegramClient(
+                    AtlasSession(config.STRING_SESSION),
+                    config.API_ID,
+                    config.API_HASH,
+                ),
+                self._login_user,
             )
-            await self.user.start()
-            log.info("Userbot started")
 
         # ---------------- Assistant Bot ----------------
         if config.BOT_TOKEN:
-            log.info("Starting bot")
-            self.bot = TelegramClient(
-                "assistant-bot",
-                config.API_ID,
-                config.API_HASH,
+            jobs["bot"] = self._start_client(
+                "bot",
+                lambda: TelegramClient(
+                    "assistant-bot",
+                    config.API_ID,
+                    config.API_HASH,
+                ),
+                lambda client: client.start(bot_token=config.BOT_TOKEN),
             )
-            await self.bot.start(bot_token=config.BOT_TOKEN)
-            log.info("Bot started")
 
         # ---------------- Validation ----------------
-        if not self.user and not self.bot:
+        if not jobs:
             raise RuntimeError(
                 "No clients configured. "
                 "Provide STRING_SESSION and/or BOT_TOKEN."
             )
 
+        results = await asyncio.gather(*jobs.values(), return_exceptions=True)
+        for name, client in zip(jobs, results):
+            if isinstance(client, Exception):
+                self.stats[name] = {"ms": 0, "attempts": 0, "error": str(client)}
+                client = None
+            elif isinstance(client, BaseException):
+                raise client
+            setattr(self, name, client)
+
+        if not self.user and not self.bot:
+            raise RuntimeError(
+                "No client could be started: "
+                + "; ".join(f"{n}: {s['error']}" for n, s in self.stats.items())
+            )
+
+    # -------------------------------------------------
+    # Login steps
+    # -------------------------------------------------
+    @staticmethod
+    async def _login_user(client: TelegramClient):
+        # start() would prompt for a phone number on stdin and block the
+        # event loop (and the bot login) if the session is not valid
+        await client.connect()
+        if not await client.is_user_authorized():
+            raise PermissionError("STRING_SESSION is not authorized")
+
+    # -------------------------------------------------
+    # Connect one client with retry / backoff
+    # -------------------------------------------------
+    async def _start_client(self, name: str, factory, login):
+        label = "Userbot" if name == "user" else "Bot"
+        delay = config.CLIENT_RETRY_DELAY
+        start = time.perf_counter()
+        error = None
+
+        log.info(f"Starting {label.lower()}")
+
+        with profiler.phase(f"clients.{name}"):
+            for attempt in range(1, config.CLIENT_START_RETRIES + 1):
+                client = None
+                try:
+                    client = factory()
+                    await login(client)
+
+                    ms = (time.perf_counter() - start) * 1000
+                    self.stats[name] = {"ms": ms, "attempts": attempt, "error": None}
+                    log.info(f"{label} started in {ms:.0f} ms (attempt {attempt})")
+                    return client
+
+                except FloodWaitError as e:
+                    error = e
+                    wait = e.seconds
+
+                except (PermissionError, ValueError, RPCError) as e:
+                    # Bad session / token: retrying will not help
+                    error = e
+                    await self._disconnect(client)
+                    break
+
+                except (OSError, asyncio.TimeoutError) as e:
+                    error = e
+                    wait = delay
+                    delay = min(delay * 2, 60)
+
+                except Exception as e:
+                    # Unexpected (e.g. session DB errors): fail this client
+                    # only, never the other one
+                    error = e
+                    await self._disconnect(client)
+                    break
+
+                await self._disconnect(client)
+
+                if attempt == config.CLIENT_START_RETRIES or wait > 60:
+                    break
+
+                log.warning(
+                    f"{label} start failed ({error}), retrying in {wait}s "
+                    f"({attempt}/{config.CLIENT_START_RETRIES})"
+                )
+                await asyncio.sleep(wait)
+
+        self.stats[name] = {
+            "ms": (time.perf_counter() - start) * 1000,
+            "attempts": attempt,
+            "error": str(error),
+        }
+        log.error(f"{label} failed to start: {error}")
+        log_event(
+            event=f"{label} failed to start",
+            details=f"{type(error).__name__}: {error}",
+        )
+        return None
+
+    @staticmethod
+    async def _disconnect(client):
+        if not client:
+            return
+        try:
+            await client.disconnect()
+        except Exception:
+            pass
+
 
 clients = Clients()
@@ -38,12 +38,76 @@ class Config:
     if RUN_MODE in ("bot", "dual") and not BOT_TOKEN:
         raise ConfigError("BOT_TOKEN is required for bot or dual mode")
 
+    # -------- Client startup --------
+    # Attempts per client; delay doubles after each failed attempt
+    CLIENT_START_RETRIES = max(1, int(os.getenv("CLIENT_START_RETRIES", "3")))
+    CLIENT_RETRY_DELAY = int(os.getenv("CLIENT_RETRY_DELAY", "2"))
+
+    # -------- Dialog warming --------
+    # Pause between dialog pages while warming the entity cache
+    DIALOG_WARM_DELAY = float(os.getenv("DIALOG_WARM_DELAY", "1"))
+    # Max seconds a lookup waits for warming before scanning on its own
+    DIALOG_WAIT = float(os.getenv("DIALOG_WAIT", "30"))
+
+    # -------- Forwarder --------
+    # Per destination chat: messages per second and burst size
+    FWD_CHAT_RATE = float(os.getenv("FWD_CHAT_RATE", "1"))
+    FWD_CHAT_BURST = int(os.getenv("FWD_CHAT_BURST", "3"))
+    # Messages per second across all destinations (0 = no limit)
+    FWD_GLOBAL_RATE = float(os.getenv("FWD_GLOBAL_RATE", "20"))
+    # Seconds a destination's worker stays up without messages
+    FWD_LANE_IDLE = float(os.getenv("FWD_LANE_IDLE", "60"))
+    # Seconds to collect messages from one source into a single forward
+    FWD_BATCH_WINDOW = float(os.getenv("FWD_BATCH_WINDOW", "1"))
+
     # -------- Owner --------
     OWNER_ID = int(_require("OWNER_ID"))
 
+    # -------- Assistant rate limiting --------
+    # chat type -> (messages, window seconds, ignore seconds); 0 disables
+    RATE_LIMITS = {
+        "private": (
+            int(os.getenv("PM_RATE_LIMIT", "5")),
+            int(os.getenv("PM_RATE_WINDOW", "60")),
+            int(os.getenv("PM_IGNORE_TIME", "600")),
+        ),
+        "group": (
+            int(os.getenv("GROUP_RATE_LIMIT", "0")),
+            int(os.getenv("GROUP_RATE_WINDOW", "60")),
+            int(os.getenv("GROUP_IGNORE_TIME", "600")),
+        ),
+    }
+    RATE_LIMIT_MAX_TRACKED = int(os.getenv("RATE_LIMIT_MAX_TRACKED", "10000"))
+
+    # -------- Command execution --------
+    MAX_CONCURRENT_COMMANDS = int(os.getenv("MAX_CONCURRENT_COMMANDS", "16"))
+    COMMAND_CONCURRENCY = int(os.getenv("COMMAND_CONCURRENCY", "4"))
+    # Run commands of one chat one after another (off by default; plugins
+    # can opt in per command with "ordered" in __plugin__ "limits")
+    ORDERED_CHATS = os.getenv("ORDERED_CHATS", "false").lower() == "true"
+    # Seconds before a command is cancelled (0 = no limit); plugins
+    # can set their own per command in __plugin__ "limits"
+    COMMAND_TIMEOUT = int(os.getenv("COMMAND_TIMEOUT", "0"))
+    # Seconds a cancelled command gets to stop on its own
+    CANCEL_GRACE = int(os.getenv("CANCEL_GRACE", "5"))
+
     # -------- Paths & storage --------
     DB_FILE = os.getenv("DB_FILE", "atlas.db")
+    # full = commit every write, normal = group commit (WAL), off = no fsync
+    DB_DURABILITY = os.getenv("DB_DURABILITY", "normal").lower()
+    # Group commit after this many ms or this many writes
+    DB_COMMIT_INTERVAL = int(os.getenv("DB_COMMIT_INTERVAL", "50"))
+    DB_COMMIT_BATCH = int(os.getenv("DB_COMMIT_BATCH", "256"))
+    # In-memory kv_store cache (0 bytes disables it)
+    KV_CACHE_MAX_BYTES = int(os.getenv("KV_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+    KV_CACHE_TTL = int(os.getenv("KV_CACHE_TTL", "600"))
     PLUGIN_PATH = os.getenv("PLUGIN_PATH", "plugins")
+    # Hot-reload plugin files as they change (inotify if watchfiles is
+    # installed, otherwise polling every PLUGIN_WATCH_INTERVAL seconds)
+    PLUGIN_WATCH = os.getenv("PLUGIN_WATCH", "false").lower() == "true"
+    PLUGIN_WATCH_INTERVAL = float(os.getenv("PLUGIN_WATCH_INTERVAL", "2"))
+    # Import + init time above which a plugin is flagged (0 = off)
+    PLUGIN_LOAD_BUDGET_MS = int(os.getenv("PLUGIN_LOAD_BUDGET_MS", "250"))
 
     # -------- Logging --------
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
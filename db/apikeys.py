@@ -1,53 +1,91 @@
 import sqlite3
 from pathlib import Path
 
-DB_PATH = Path("db/apikeys.db")
+from db.core import db
+from utils.logger import log
 
 
-def _connect():
-    DB_PATH.parent.mkdir(exist_ok=True)
-    return sqlite3.connect(DB_PATH)
+# Standalone key store used before keys moved into the main DB
+LEGACY_DB_PATH = Path("db/apikeys.db")
+
+# name -> value, loaded once by init()
+_keys: dict[str, str] = {}
+_loaded = False
 
 
 def init():
-    with _connect() as con:
-        con.execute(
-            """
-            CREATE TABLE IF NOT EXISTS apikeys (
-                name TEXT PRIMARY KEY,
-                value TEXT NOT NULL
-            )
-            """
-        )
+    global _loaded
+    if _loaded:
+        return
 
+    _migrate_legacy()
 
-def set_key(name: str, value: str):
-    with _connect() as con:
-        con.execute(
-            "REPLACE INTO apikeys (name, value) VALUES (?, ?)",
+    rows = db.execute("SELECT name, value FROM api_keys").fetchall()
+    _keys.clear()
+    _keys.update((row["name"], row["value"]) for row in rows)
+    _loaded = True
+
+
+def _migrate_legacy():
+    if not LEGACY_DB_PATH.exists():
+        return
+
+    try:
+        with sqlite3.connect(LEGACY_DB_PATH) as con:
+            rows = con.execute("SELECT name, value FROM apikeys").fetchall()
+    except sqlite3.Error as e:
+        log.error(f"Could not read legacy API key store: {e}")
+        return
+
+    # Keys already in the main DB are newer; keep them
+    for name, value in rows:
+        db.execute(
+            "INSERT OR IGNORE INTO api_keys (name, value) VALUES (?, ?)",
             (name.upper(), value),
         )
 
+    # Inserts are group-committed; the old file must outlive them
+    db.flush_sync()
+    names = {name.upper() for name, _ in rows}
+    stored = {
+        row["name"]
+        for row in db.execute("SELECT name FROM api_keys").fetchall()
+    }
+    if not names <= stored:
+        log.error("API key migration incomplete, keeping legacy store")
+        return
+
+    LEGACY_DB_PATH.rename(LEGACY_DB_PATH.with_suffix(".db.migrated"))
+    log.info(f"Migrated {len(rows)} API keys from {LEGACY_DB_PATH}")
+
+
+def set_key(name: str, value: str):
+    init()
+    name = name.upper()
+    _keys[name] = value
+    db.execute(
+        """
+        INSERT INTO api_keys (name, value) VALUES (?, ?)
+        ON CONFLICT(name) DO UPDATE SET
+            value=excluded.value,
+            updated_at=CURRENT_TIMESTAMP
+        """,
+        (name, value),
+    )
+
 
 def get_key(name: str):
-    with _connect() as con:
-        cur = con.execute(
-            "SELECT value FROM apikeys WHERE name = ?",
-            (name.upper(),),
-        )
-        row = cur.fetchone()
-        return row[0] if row else None
+    init()
+    return _keys.get(name.upper())
 
 
 def delete_key(name: str):
-    with _connect() as con:
-        con.execute(
-            "DELETE FROM apikeys WHERE name = ?",
-            (name.upper(),),
-        )
+    init()
+    name = name.upper()
+    _keys.pop(name, None)
+    db.execute("DELETE FROM api_keys WHERE name = ?", (name,))
 
 
 def list_keys():
-    with _connect() as con:
-        cur = con.execute("SELECT name FROM apikeys")
-        return [row[0] for row in cur.fetchall()]
+    init()
+    return sorted(_keys)
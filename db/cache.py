@@ -0,0 +1,155 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+# Cached "key does not exist"
+MISSING = object()
+
+# Rough per-entry overhead (dict slot, tuple, floats)
+_ENTRY_OVERHEAD = 100
+
+
+def _size(key: str, value) -> int:
+    if value is MISSING or value is None:
+        return len(key) + _ENTRY_OVERHEAD
+    if isinstance(value, list):
+        return len(key) + sum(len(v) for v in value) + _ENTRY_OVERHEAD
+    return len(key) + len(value) + _ENTRY_OVERHEAD
+
+
+class KVCache:
+    """
+    LRU + TTL cache in front of kv_store, bounded by an estimate of the
+    memory its keys and values take.
+
+    Values (including "missing") and keys(prefix) listings are cached.
+    Writes go through update() / remove(), which also drop every cached
+    listing whose prefix covers the key. Lookups that raced with a write
+    are not cached (see epoch()).
+    """
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+        self._values = OrderedDict()  # key -> (value, expires)
+        self._prefixes = OrderedDict()  # prefix -> (keys, expires)
+        self._epoch = 0  # bumped on every write
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._values) + len(self._prefixes)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def epoch(self) -> int:
+        """
+        Write counter; take it before a DB read and pass it to fill().
+        """
+        return self._epoch
+
+    # -------------------------------------------------
+    # Lookups
+    # -------------------------------------------------
+    def get(self, key: str):
+        return self._lookup(self._values, key)
+
+    def get_keys(self, prefix: str):
+        return self._lookup(self._prefixes, prefix)
+
+    def _lookup(self, table, key):
+        with self._lock:
+            entry = table.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                self.stats["misses"] += 1
+                return None
+
+            table.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[0]
+
+    # -------------------------------------------------
+    # Fills (after a DB read)
+    # -------------------------------------------------
+    def fill(self, key: str, value, epoch: int):
+        self._store(self._values, key, MISSING if value is None else value, epoch)
+
+    def fill_keys(self, prefix: str, keys: list, epoch: int):
+        self._store(self._prefixes, prefix, keys, epoch)
+
+    def _store(self, table, key, value, epoch=None):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            # A write landed while this value was being read
+            if epoch is not None and epoch != self._epoch:
+                return
+
+            old = table.pop(key, None)
+            if old is not None:
+                self.bytes -= _size(key, old[0])
+
+            table[key] = (value, time.monotonic() + self.ttl)
+            self.bytes += _size(key, value)
+            self._evict()
+
+    def _evict(self):
+        while self.bytes > self.max_bytes and (self._values or self._prefixes):
+            # Prefix listings are the bigger entries; drop those first
+            table = self._prefixes or self._values
+            key, (value, _) = table.popitem(last=False)
+            self.bytes -= _size(key, value)
+            self.stats["evictions"] += 1
+
+    # -------------------------------------------------
+    # Write-through
+    # -------------------------------------------------
+    def update(self, key: str, value: str):
+        self._write(key)
+        self._store(self._values, key, value)
+
+    def remove(self, key: str):
+        self._write(key)
+        self._store(self._values, key, MISSING)
+
+    def discard(self, key: str):
+        """
+        Forget `key` entirely, e.g. after its write failed.
+        """
+        self._write(key)
+        with self._lock:
+            old = self._values.pop(key, None)
+            if old is not None:
+                self.bytes -= _size(key, old[0])
+
+    def _write(self, key: str):
+        with self._lock:
+            self._epoch += 1
+            for prefix in [p for p in self._prefixes if key.startswith(p)]:
+                self.bytes -= _size(prefix, self._prefixes.pop(prefix)[0])
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._values.clear()
+            self._prefixes.clear()
+            self.bytes = 0
+
+    def reset_stats(self):
+        self.stats = dict.fromkeys(self.stats, 0)
+
+    def to_dict(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+            "entries": len(self),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+        }
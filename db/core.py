@@ -1,55 +1,403 @@
+import asyncio
+import atexit
+import queue
 import sqlite3
 import threading
+import time
+from concurrent.futures import Future
+
+from db.cache import MISSING, KVCache
 from db.schema import SCHEMA
 from utils.logger import log
 from config import config
 
 
+# durability -> PRAGMA synchronous
+_SYNCHRONOUS = {"full": "FULL", "normal": "NORMAL", "off": "OFF"}
+
+_STOP = object()
+
+
+class Result:
+    """
+    Materialized cursor: rows are fetched on the writer thread, so the
+    result can be read from any thread.
+    """
+
+    __slots__ = ("rows", "lastrowid", "rowcount", "_pos")
+
+    def __init__(self, rows=(), lastrowid=None, rowcount=-1):
+        self.rows = rows
+        self.lastrowid = lastrowid
+        self.rowcount = rowcount
+        self._pos = 0
+
+    def fetchone(self):
+        if self._pos >= len(self.rows):
+            return None
+        self._pos += 1
+        return self.rows[self._pos - 1]
+
+    def fetchall(self):
+        rows, self._pos = self.rows[self._pos:], len(self.rows)
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+
+class _Job:
+    __slots__ = ("sql", "params", "future", "write", "durable")
+
+    def __init__(self, sql, params, write, durable):
+        self.sql = sql
+        self.params = params
+        self.future = Future()
+        self.write = write
+        self.durable = durable
+
+
+def _is_write(sql: str) -> bool:
+    return not sql.lstrip()[:7].upper().startswith(
+        ("SELECT", "WITH", "EXPLAIN", "PRAGMA")
+    )
+
+
+def prefix_upper(prefix: str) -> str | None:
+    """
+    Smallest string above every string starting with `prefix`, so that
+    key >= prefix AND key < upper is an index range scan (LIKE 'p%' is
+    not, and treats _ and % in the prefix as wildcards).
+    None if there is no upper bound.
+    """
+    chars = list(prefix)
+    while chars:
+        code = ord(chars.pop()) + 1
+        if code == 0xD800:
+            code = 0xE000  # skip surrogates, they are not valid UTF-8
+        if code <= 0x10FFFF:
+            return "".join(chars) + chr(code)
+    return None
+
+
+def _prefix_range(prefix: str) -> tuple[str, tuple]:
+    upper = prefix_upper(prefix)
+    if upper is None:
+        return "key >= ?", (prefix,)
+    return "key >= ? AND key < ?", (prefix, upper)
+
+
+def _log_failure(future: Future):
+    error = future.exception()
+    if error:
+        log.error(f"Database write failed: {error}")
+
+
 class Database:
+    """
+    SQLite behind a single writer thread.
+
+    Every statement runs on that thread, in submission order, so reads
+    always see earlier writes. Writes are grouped into one transaction
+    that is committed every DB_COMMIT_INTERVAL ms or DB_COMMIT_BATCH
+    statements. DB_DURABILITY picks the trade-off:
+
+    full    each write is committed (and fsynced) before it returns
+    normal  group commit, WAL + synchronous=NORMAL (default)
+    off     group commit, no fsync at all
+
+    The async API (aexecute, aget, aset, ...) never blocks the event
+    loop. The sync API is kept for compatibility: reads wait for their
+    rows, writes only wait when durability is "full".
+    """
+
     def __init__(self):
-        self._lock = threading.Lock()
-        self._conn = sqlite3.connect(
-            config.DB_FILE, check_same_thread=False
-        )
+        self.durability = config.DB_DURABILITY
+        if self.durability not in _SYNCHRONOUS:
+            raise ValueError("DB_DURABILITY must be one of: full, normal, off")
+
+        self._interval = config.DB_COMMIT_INTERVAL / 1000
+        self._batch = config.DB_COMMIT_BATCH
+
+        self._conn = sqlite3.connect(config.DB_FILE, check_same_thread=False)
         self._conn.row_factory = sqlite3.Row
         self._init()
 
+        self.stats = {"statements": 0, "commits": 0}
+        self.cache = KVCache(config.KV_CACHE_MAX_BYTES, config.KV_CACHE_TTL)
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()  # inline execution after close()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._writer,
+            name="atlas-db-writer",
+            daemon=True,
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
     def _init(self):
-        with self._lock:
-            self._conn.executescript(SCHEMA)
-            self._conn.commit()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={_SYNCHRONOUS[self.durability]}")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
         log.info("Database initialized")
 
-    def execute(self, q, p=()):
-        with self._lock:
-            cur = self._conn.execute(q, p)
+    # -------------------------------------------------
+    # Writer thread
+    # -------------------------------------------------
+    def _writer(self):
+        conn = self._conn
+        pending = []  # executed writes waiting for the next commit
+        deadline = None
+
+        while True:
+            timeout = None if deadline is None else max(0, deadline - time.monotonic())
+            try:
+                job = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                job = None
+
+            if job is _STOP:
+                self._commit(pending)
+                return
+
+            if job is not None:
+                try:
+                    cur = conn.execute(job.sql, job.params)
+                    result = Result(
+                        cur.fetchall() if cur.description else [],
+                        cur.lastrowid,
+                        cur.rowcount,
+                    )
+                except Exception as e:
+                    job.future.set_exception(e)
+                    continue
+                finally:
+                    self.stats["statements"] += 1
+
+                if not job.write:
+                    job.future.set_result(result)
+                    continue
+
+                if job.durable:
+                    pending.append((job, result))
+                else:
+                    job.future.set_result(result)
+                    pending.append((None, None))
+
+                if deadline is None:
+                    deadline = time.monotonic() + self._interval
+
+            if pending and (
+                job is None
+                or len(pending) >= self._batch
+                or (job.durable and job.write)
+                or time.monotonic() >= deadline
+            ):
+                self._commit(pending)
+                pending = []
+                deadline = None
+
+    def _commit(self, pending):
+        if not pending:
+            return
+
+        try:
             self._conn.commit()
-            return cur
+            self.stats["commits"] += 1
+        except Exception as e:
+            log.error(f"Database commit failed: {e}")
+            self._conn.rollback()
+            # Cached values may come from the writes just rolled back
+            self.cache.clear()
+            for job, _ in pending:
+                if job:
+                    job.future.set_exception(e)
+            return
+
+        for job, result in pending:
+            if job:
+                job.future.set_result(result)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    # -------------------------------------------------
+    # Submission
+    # -------------------------------------------------
+    def _submit(self, q, p) -> Future:
+        write = _is_write(q)
+        job = _Job(q, p, write, self.durability == "full")
+
+        if self._closed:
+            with self._lock:
+                try:
+                    cur = self._conn.execute(q, p)
+                    job.future.set_result(
+                        Result(cur.fetchall() if cur.description else [])
+                    )
+                    self._conn.commit()
+                except Exception as e:
+                    job.future.set_exception(e)
+            return job.future
+
+        self._queue.put(job)
+        return job.future
+
+    def execute(self, q, p=()):
+        return self._result(self._submit(q, p), q)
+
+    def _result(self, future: Future, q):
+        if _is_write(q) and self.durability != "full":
+            # Nobody waits for this write; at least report failures
+            future.add_done_callback(_log_failure)
+            return Result()
+        return future.result()
+
+    async def aexecute(self, q, p=()):
+        return await asyncio.wrap_future(self._submit(q, p))
+
+    def _flush_job(self) -> Future:
+        job = _Job("SELECT 1", (), True, True)
+        if self._closed:
+            # Statements already run inline and commit right away
+            job.future.set_result(Result())
+        else:
+            self._queue.put(job)
+        return job.future
+
+    async def flush(self):
+        """
+        Wait until every write submitted so far is committed.
+        """
+        await asyncio.wrap_future(self._flush_job())
+
+    def flush_sync(self):
+        """
+        flush() for sync callers; blocks the calling thread.
+        """
+        self._flush_job().result()
+
+    # -------------------------------------------------
+    # Key-value helpers (sync, read-through cache)
+    # -------------------------------------------------
+    def _kv_write(self, key, q, p) -> Future:
+        # The cache is updated before the write runs; forget the key if
+        # the write fails so the cache never serves a value the DB lacks
+        future = self._submit(q, p)
+        future.add_done_callback(
+            lambda f: f.exception() and self.cache.discard(key)
+        )
+        return future
 
     def get(self, key, default=None):
-        row = self.execute(
-            "SELECT value FROM kv_store WHERE key = ?", (key,)
-        ).fetchone()
-        return row["value"] if row else default
+        value = self.cache.get(key)
+        if value is None:
+            epoch = self.cache.epoch()
+            row = self.execute(
+                "SELECT value FROM kv_store WHERE key = ?", (key,)
+            ).fetchone()
+            value = row["value"] if row else None
+            self.cache.fill(key, value, epoch)
+        return default if value is None or value is MISSING else value
 
     def set(self, key, value):
-        self.execute(
-            "INSERT OR REPLACE INTO kv_store VALUES (?, ?)",
-            (key, str(value)),
-        )
+        value = str(value)
+        self.cache.update(key, value)
+        q = "INSERT OR REPLACE INTO kv_store VALUES (?, ?)"
+        self._result(self._kv_write(key, q, (key, value)), q)
 
     def delete(self, key):
-        self.execute(
-            "DELETE FROM kv_store WHERE key = ?",
-            (key,),
-        )
+        self.cache.remove(key)
+        q = "DELETE FROM kv_store WHERE key = ?"
+        self._result(self._kv_write(key, q, (key,)), q)
 
     def keys(self, prefix):
-        rows = self.execute(
-            "SELECT key FROM kv_store WHERE key LIKE ?",
-            (f"{prefix}%",),
-        ).fetchall()
-        return [r["key"] for r in rows]
+        keys = self.cache.get_keys(prefix)
+        if keys is None:
+            epoch = self.cache.epoch()
+            where, params = _prefix_range(prefix)
+            rows = self.execute(
+                f"SELECT key FROM kv_store WHERE {where} ORDER BY key",
+                params,
+            ).fetchall()
+            keys = [r["key"] for r in rows]
+            self.cache.fill_keys(prefix, keys, epoch)
+        return list(keys)
+
+    # -------------------------------------------------
+    # Key-value helpers (async, read-through cache)
+    # -------------------------------------------------
+    async def aget(self, key, default=None):
+        value = self.cache.get(key)
+        if value is None:
+            epoch = self.cache.epoch()
+            row = (
+                await self.aexecute(
+                    "SELECT value FROM kv_store WHERE key = ?", (key,)
+                )
+            ).fetchone()
+            value = row["value"] if row else None
+            self.cache.fill(key, value, epoch)
+        return default if value is None or value is MISSING else value
+
+    async def aset(self, key, value):
+        value = str(value)
+        self.cache.update(key, value)
+        q = "INSERT OR REPLACE INTO kv_store VALUES (?, ?)"
+        await asyncio.wrap_future(self._kv_write(key, q, (key, value)))
+
+    async def adelete(self, key):
+        self.cache.remove(key)
+        q = "DELETE FROM kv_store WHERE key = ?"
+        await asyncio.wrap_future(self._kv_write(key, q, (key,)))
+
+    async def akeys(self, prefix):
+        keys = self.cache.get_keys(prefix)
+        if keys is None:
+            epoch = self.cache.epoch()
+            where, params = _prefix_range(prefix)
+            rows = (
+                await self.aexecute(
+                    f"SELECT key FROM kv_store WHERE {where} ORDER BY key",
+                    params,
+                )
+            ).fetchall()
+            keys = [r["key"] for r in rows]
+            self.cache.fill_keys(prefix, keys, epoch)
+        return list(keys)
+
+    async def iter_prefix(self, prefix: str, values: bool = False, page: int = 200):
+        """
+        Stream keys starting with `prefix` in key order, `page` rows per
+        query (keyset pagination). Yields keys, or (key, value) pairs
+        when values=True.
+        """
+        upper = prefix_upper(prefix)
+        columns = "key, value" if values else "key"
+        bound = " AND key < ?" if upper is not None else ""
+        last, op = prefix, ">="
+
+        while True:
+            params = (last, upper) if upper is not None else (last,)
+            rows = (
+                await self.aexecute(
+                    f"SELECT {columns} FROM kv_store "
+                    f"WHERE key {op} ?{bound} ORDER BY key LIMIT {int(page)}",
+                    params,
+                )
+            ).fetchall()
+
+            for row in rows:
+                yield (row["key"], row["value"]) if values else row["key"]
 
+            if len(rows) < page:
+                return
+            last, op = rows[-1]["key"], ">"
 
 db = Database()
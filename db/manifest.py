@@ -0,0 +1,81 @@
+import json
+
+from db.core import db
+
+
+def _encode(info):
+    if not info:
+        return None
+    try:
+        # Literal __plugin__ values may hold tuples / sets
+        return json.dumps(info, default=list)
+    except (TypeError, ValueError):
+        return None  # cached as not inspectable: imported eagerly
+
+
+def _decode(raw):
+    if not raw:
+        return None
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return {}  # older format: no version, so it is re-parsed
+
+
+def get_all():
+    rows = db.execute("SELECT * FROM plugin_manifest").fetchall()
+    return {row["path"]: row for row in rows}
+
+
+def get_by_module(module: str):
+    return db.execute(
+        "SELECT * FROM plugin_manifest WHERE module=?",
+        (module,),
+    ).fetchone()
+
+
+def get_info(row):
+    return _decode(row["info"]) if row else None
+
+
+def save(path, module, mtime, size, digest, info):
+    db.execute(
+        """
+        INSERT INTO plugin_manifest (path, module, mtime, size, hash, info)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(path) DO UPDATE SET
+            module=excluded.module,
+            mtime=excluded.mtime,
+            size=excluded.size,
+            hash=excluded.hash,
+            info=excluded.info,
+            scanned_at=CURRENT_TIMESTAMP
+        """,
+        (path, module, mtime, size, digest, _encode(info)),
+    )
+
+
+def touch(path, mtime, size):
+    db.execute(
+        "UPDATE plugin_manifest SET mtime=?, size=? WHERE path=?",
+        (mtime, size, path),
+    )
+
+
+def mark_imported(module: str, initialized: bool = False):
+    db.execute(
+        """
+        UPDATE plugin_manifest
+        SET imported_at=CURRENT_TIMESTAMP,
+            init_at=CASE WHEN ? THEN CURRENT_TIMESTAMP ELSE init_at END
+        WHERE module=?
+        """,
+        (initialized, module),
+    )
+
+
+def prune(paths):
+    known = set(paths)
+    for path in get_all():
+        if path not in known:
+            db.execute("DELETE FROM plugin_manifest WHERE path=?", (path,))
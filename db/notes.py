@@ -0,0 +1,222 @@
+import asyncio
+import sqlite3
+
+from db.core import db
+from utils.logger import log
+
+
+# Kept in sync with notes by triggers; external content, so text is stored once
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE notes_fts USING fts5(
+    name,
+    content,
+    content='notes',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS notes_ai AFTER INSERT ON notes BEGIN
+    INSERT INTO notes_fts (rowid, name, content)
+    VALUES (new.id, new.name, new.content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS notes_ad AFTER DELETE ON notes BEGIN
+    INSERT INTO notes_fts (notes_fts, rowid, name, content)
+    VALUES ('delete', old.id, old.name, old.content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS notes_au AFTER UPDATE ON notes BEGIN
+    INSERT INTO notes_fts (notes_fts, rowid, name, content)
+    VALUES ('delete', old.id, old.name, old.content);
+    INSERT INTO notes_fts (rowid, name, content)
+    VALUES (new.id, new.name, new.content);
+END;
+"""
+
+# Old kv_store layout: notes:{chat_id}:{name}
+_LEGACY_PREFIX = "notes:"
+
+fts_enabled = False
+_ready = False
+_setup_lock = asyncio.Lock()
+
+
+# -------------------------------------------------
+# One-time setup (FTS index + kv_store migration)
+# -------------------------------------------------
+async def setup():
+    global _ready, fts_enabled
+    if _ready:
+        return
+
+    async with _setup_lock:
+        if _ready:
+            return
+
+        await _migrate_legacy()
+
+        exists = (
+            await db.aexecute(
+                "SELECT 1 FROM sqlite_master WHERE name='notes_fts'"
+            )
+        ).fetchone()
+
+        if exists:
+            fts_enabled = True
+        else:
+            try:
+                for statement in FTS_SCHEMA.split(";\n\n"):
+                    await db.aexecute(statement)
+                # Index notes written before the FTS table existed
+                await db.aexecute(
+                    "INSERT INTO notes_fts (notes_fts) VALUES ('rebuild')"
+                )
+                fts_enabled = True
+            except sqlite3.OperationalError as e:
+                log.warning(f"FTS5 unavailable, note search falls back to LIKE: {e}")
+
+        _ready = True
+
+
+async def _migrate_legacy():
+    moved = []
+    async for key, value in db.iter_prefix(_LEGACY_PREFIX, values=True):
+        try:
+            _, chat_id, name = key.split(":", 2)
+            chat_id = int(chat_id)
+        except ValueError:
+            continue
+
+        await db.aexecute(
+            "INSERT OR IGNORE INTO notes (chat_id, name, content) VALUES (?, ?, ?)",
+            (chat_id, name, value),
+        )
+        moved.append(key)
+
+    for key in moved:
+        await db.adelete(key)
+
+    if moved:
+        log.info(f"Migrated {len(moved)} notes from kv_store")
+
+
+# -------------------------------------------------
+# CRUD
+# -------------------------------------------------
+async def save(chat_id: int, name: str, content: str):
+    await setup()
+    await db.aexecute(
+        """
+        INSERT INTO notes (chat_id, name, content) VALUES (?, ?, ?)
+        ON CONFLICT(chat_id, name) DO UPDATE SET
+            content=excluded.content,
+            updated_at=CURRENT_TIMESTAMP
+        """,
+        (chat_id, name.lower(), content),
+    )
+
+
+async def get(chat_id: int, name: str):
+    await setup()
+    row = (
+        await db.aexecute(
+            "SELECT content FROM notes WHERE chat_id=? AND name=?",
+            (chat_id, name.lower()),
+        )
+    ).fetchone()
+    return row["content"] if row else None
+
+
+async def delete(chat_id: int, name: str) -> bool:
+    await setup()
+    result = await db.aexecute(
+        "DELETE FROM notes WHERE chat_id=? AND name=?",
+        (chat_id, name.lower()),
+    )
+    return result.rowcount > 0
+
+
+async def iter_names(chat_id: int, page: int = 200):
+    """
+    Stream a chat's note names in order, `page` rows per query.
+    """
+    await setup()
+    last = ""
+    while True:
+        rows = (
+            await db.aexecute(
+                "SELECT name FROM notes WHERE chat_id=? AND name > ? "
+                f"ORDER BY name LIMIT {int(page)}",
+                (chat_id, last),
+            )
+        ).fetchall()
+
+        for row in rows:
+            yield row["name"]
+
+        if len(rows) < page:
+            return
+        last = rows[-1]["name"]
+
+
+# -------------------------------------------------
+# Search
+# -------------------------------------------------
+def _match_query(text: str) -> str:
+    """
+    Plain words -> FTS5 query: every word must match, the last one as
+    a prefix. Quoting keeps user input from being parsed as syntax.
+    """
+    terms = ['"' + word.replace('"', '""') + '"' for word in text.split()]
+    if terms:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+async def search(text: str, chat_id: int | None = None, limit: int = 10) -> list:
+    """
+    Best matches first: [{"chat_id", "name", "snippet"}]. Matches in the
+    snippet are wrapped in ** (Telegram bold).
+    """
+    await setup()
+
+    query = _match_query(text)
+    if not query:
+        return []
+
+    scope = "AND n.chat_id = ?" if chat_id is not None else ""
+    params = (query, chat_id, limit) if chat_id is not None else (query, limit)
+
+    if fts_enabled:
+        rows = (
+            await db.aexecute(
+                f"""
+                SELECT n.chat_id, n.name,
+                       snippet(notes_fts, 1, '**', '**', '…', 16) AS snippet
+                FROM notes_fts
+                JOIN notes n ON n.id = notes_fts.rowid
+                WHERE notes_fts MATCH ? {scope}
+                ORDER BY bm25(notes_fts, 5.0, 1.0)
+                LIMIT ?
+                """,
+                params,
+            )
+        ).fetchall()
+    else:
+        # Substring match on the whole text, newest first
+        pattern = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        rows = (
+            await db.aexecute(
+                f"""
+                SELECT n.chat_id, n.name, substr(n.content, 1, 120) AS snippet
+                FROM notes n
+                WHERE (n.content LIKE ? ESCAPE '\\' OR n.name LIKE ? ESCAPE '\\')
+                {scope}
+                ORDER BY n.updated_at DESC
+                LIMIT ?
+                """,
+                (pattern, pattern, *params[1:]),
+            )
+        ).fetchall()
+
+    return [dict(row) for row in rows]
@@ -0,0 +1,53 @@
+from db.core import db
+
+
+# Boots kept for comparison
+KEEP_BOOTS = 10
+
+
+def next_boot_id() -> int:
+    row = db.execute("SELECT MAX(boot_id) AS last FROM startup_profile").fetchone()
+    return (row["last"] or 0) + 1
+
+
+def save(boot_id: int, entries):
+    """
+    entries: [(kind, name, ms)], written in one statement.
+    """
+    entries = list(entries)
+    if not entries:
+        return
+
+    values = ", ".join(["(?, ?, ?, ?)"] * len(entries))
+    params = [v for kind, name, ms in entries for v in (boot_id, kind, name, ms)]
+    db.execute(
+        "INSERT OR REPLACE INTO startup_profile (boot_id, kind, name, ms) "
+        f"VALUES {values}",
+        params,
+    )
+
+
+def boots(limit: int = 2) -> list:
+    rows = db.execute(
+        "SELECT DISTINCT boot_id FROM startup_profile ORDER BY boot_id DESC LIMIT ?",
+        (limit,),
+    ).fetchall()
+    return [row["boot_id"] for row in rows]
+
+
+def get(boot_id: int) -> dict:
+    rows = db.execute(
+        "SELECT kind, name, ms FROM startup_profile WHERE boot_id=?",
+        (boot_id,),
+    ).fetchall()
+    return {(row["kind"], row["name"]): row["ms"] for row in rows}
+
+
+def prune(keep: int = KEEP_BOOTS):
+    db.execute(
+        """
+        DELETE FROM startup_profile
+        WHERE boot_id <= (SELECT MAX(boot_id) FROM startup_profile) - ?
+        """,
+        (keep,),
+    )
@@ -7,6 +7,30 @@ CREATE TABLE IF NOT EXISTS kv_store (
     value TEXT
 );
 
+-- =========================
+-- API Keys
+-- =========================
+-- Third-party API keys set with .setapi (names are upper case)
+CREATE TABLE IF NOT EXISTS api_keys (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- =========================
+-- Notes
+-- =========================
+-- Full-text index (notes_fts) is created by db/notes.py when FTS5 is available
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY,
+    chat_id INTEGER NOT NULL,
+    name TEXT NOT NULL,                -- lower case
+    content TEXT NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (chat_id, name)
+);
+
 -- =========================
 -- Plugins State
 -- =========================
@@ -15,6 +39,59 @@ CREATE TABLE IF NOT EXISTS plugins (
     enabled INTEGER DEFAULT 1
 );
 
+-- =========================
+-- Plugin Manifest
+-- =========================
+-- Statically extracted plugin metadata, re-parsed only when a file changes
+CREATE TABLE IF NOT EXISTS plugin_manifest (
+    path TEXT PRIMARY KEY,             -- plugins/utils/notes.py
+    module TEXT NOT NULL,              -- plugins.utils.notes
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    hash TEXT NOT NULL,                -- sha256 of the source
+    info TEXT,                         -- JSON of inspect_source(), NULL if not inspectable
+    scanned_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    imported_at DATETIME,
+    init_at DATETIME
+);
+
+-- =========================
+-- Startup Profile
+-- =========================
+-- Per-boot timings of startup phases and plugin import / init
+CREATE TABLE IF NOT EXISTS startup_profile (
+    boot_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,                -- phase | import | init
+    name TEXT NOT NULL,                -- phase name or plugin module
+    ms REAL NOT NULL,
+    recorded_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (boot_id, kind, name)
+);
+
+-- =========================
+-- Userbot Session Cache
+-- =========================
+-- Entity access hashes and update state for the StringSession userbot,
+-- so peers resolve locally after .restart / .update
+CREATE TABLE IF NOT EXISTS session_entities (
+    id INTEGER PRIMARY KEY,            -- marked peer id
+    hash INTEGER NOT NULL,             -- access hash (0 for small groups)
+    username TEXT,
+    phone TEXT,
+    name TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_session_entities_username
+    ON session_entities (username);
+
+CREATE TABLE IF NOT EXISTS session_updates (
+    id INTEGER PRIMARY KEY,            -- 0 = account, else channel id
+    pts INTEGER NOT NULL,
+    qts INTEGER NOT NULL,
+    date INTEGER NOT NULL,             -- unix time
+    seq INTEGER NOT NULL
+);
+
 -- =========================
 -- Sudo / Admin Users
 -- =========================
@@ -0,0 +1,188 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from telethon import utils
+from telethon.sessions import StringSession
+from telethon.tl.types import PeerChannel, PeerChat, PeerUser
+from telethon.tl.types.updates import State
+
+from db.core import db
+
+
+_OWNER_KEY = "session:owner"
+
+# Buffered entity rows are written at most this often / this many at once
+FLUSH_INTERVAL = 5
+FLUSH_ROWS = 100
+
+
+class AtlasSession(StringSession):
+    """
+    StringSession that keeps its entity cache and update state in the
+    Atlas database. The auth key stays in the portable session string,
+    but access hashes survive os.execv restarts, so entity lookups after
+    .restart / .update are served locally.
+
+    Lookups use in-memory indexes; new or changed entities are written
+    in batches instead of on every API result.
+    """
+
+    def __init__(self, string: str = None):
+        super().__init__(string)
+
+        self._by_id = {}  # marked id -> (hash, username, phone, name)
+        self._by_username = {}  # username -> marked id
+        self._by_phone = {}  # phone -> marked id
+        self._dirty = {}
+        self._flushed = time.monotonic()
+
+        self._check_owner()
+        self._load()
+
+    # -------------------------------------------------
+    # Persistence
+    # -------------------------------------------------
+    def _check_owner(self):
+        if not self.auth_key:
+            return
+
+        # Cached hashes are only valid for the account that fetched them
+        owner = hashlib.sha256(self.auth_key.key).hexdigest()[:16]
+        if db.get(_OWNER_KEY) != owner:
+            self.delete()
+            db.set(_OWNER_KEY, owner)
+
+    def _load(self):
+        rows = db.execute(
+            "SELECT id, hash, username, phone, name FROM session_entities"
+        ).fetchall()
+        for row in rows:
+            self._index(row["id"], (row["hash"], row["username"], row["phone"], row["name"]))
+
+    def _index(self, marked_id: int, values: tuple):
+        old = self._by_id.get(marked_id)
+        if old:
+            if old[1] and self._by_username.get(old[1]) == marked_id:
+                del self._by_username[old[1]]
+            if old[2] and self._by_phone.get(old[2]) == marked_id:
+                del self._by_phone[old[2]]
+
+        self._by_id[marked_id] = values
+        if values[1]:
+            self._by_username[values[1]] = marked_id
+        if values[2]:
+            self._by_phone[values[2]] = marked_id
+
+    def _flush(self):
+        rows = list(self._dirty.items())
+        self._dirty.clear()
+        self._flushed = time.monotonic()
+
+        for i in range(0, len(rows), FLUSH_ROWS):
+            chunk = rows[i:i + FLUSH_ROWS]
+            db.execute(
+                "INSERT OR REPLACE INTO session_entities "
+                "(id, hash, username, phone, name) VALUES "
+                + ", ".join(["(?, ?, ?, ?, ?)"] * len(chunk)),
+                [v for marked_id, values in chunk for v in (marked_id, *values)],
+            )
+
+    def save(self):
+        if self._dirty:
+            self._flush()
+        return super().save()
+
+    def close(self):
+        if self._dirty:
+            self._flush()
+        super().close()
+
+    def delete(self):
+        self._by_id.clear()
+        self._by_username.clear()
+        self._by_phone.clear()
+        self._dirty.clear()
+        db.execute("DELETE FROM session_entities")
+        db.execute("DELETE FROM session_updates")
+
+    # -------------------------------------------------
+    # Entities
+    # -------------------------------------------------
+    def process_entities(self, tlo):
+        for marked_id, *values in self._entities_to_rows(tlo):
+            values = tuple(values)
+            if self._by_id.get(marked_id) != values:
+                self._index(marked_id, values)
+                self._dirty[marked_id] = values
+
+        if self._dirty and (
+            len(self._dirty) >= FLUSH_ROWS
+            or time.monotonic() - self._flushed >= FLUSH_INTERVAL
+        ):
+            self._flush()
+
+    def _row(self, marked_id):
+        values = self._by_id.get(marked_id)
+        return (marked_id, values[0]) if values else None
+
+    def get_entity_rows_by_phone(self, phone):
+        return self._row(self._by_phone.get(phone))
+
+    def get_entity_rows_by_username(self, username):
+        return self._row(self._by_username.get(username))
+
+    def get_entity_rows_by_name(self, name):
+        for marked_id, values in self._by_id.items():
+            if values[3] == name:
+                return marked_id, values[0]
+        return None
+
+    def get_entity_rows_by_id(self, id, exact=True):
+        if exact:
+            return self._row(id)
+
+        for peer in (PeerUser(id), PeerChat(id), PeerChannel(id)):
+            row = self._row(utils.get_peer_id(peer))
+            if row:
+                return row
+        return None
+
+    # -------------------------------------------------
+    # Update state
+    # -------------------------------------------------
+    def set_update_state(self, entity_id, state):
+        db.execute(
+            """
+            INSERT OR REPLACE INTO session_updates (id, pts, qts, date, seq)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (
+                entity_id,
+                state.pts,
+                state.qts,
+                int(state.date.timestamp()) if state.date else 0,
+                state.seq,
+            ),
+        )
+
+    def get_update_state(self, entity_id):
+        row = db.execute(
+            "SELECT * FROM session_updates WHERE id=?",
+            (entity_id,),
+        ).fetchone()
+        return self._state(row) if row else None
+
+    def get_update_states(self):
+        rows = db.execute("SELECT * FROM session_updates").fetchall()
+        return [(row["id"], self._state(row)) for row in rows]
+
+    @staticmethod
+    def _state(row) -> State:
+        return State(
+            pts=row["pts"],
+            qts=row["qts"],
+            date=datetime.fromtimestamp(row["date"], tz=timezone.utc),
+            seq=row["seq"],
+            unread_count=0,
+        )
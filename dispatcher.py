@@ -1,10 +1,16 @@
 from telethon.events import NewMessage
+from contextlib import asynccontextmanager
+import asyncio
+import itertools
 import time
 import traceback
 import re
 
 from config import config
 from utils.logger import log_event
+from utils.respond import respond
+from utils.metrics import LoopTimer, metrics
+from utils.ratelimit import RateLimiter
 
 from plugins.system.afk import AFK, clear_afk
 
@@ -13,33 +19,147 @@ from plugins.system.afk import AFK, clear_afk
 # Assistant abuse / rate limiting (assistant bot only)
 # -------------------------------------------------
 
-PM_RATE_LIMIT = 5
-PM_RATE_WINDOW = 60
-PM_IGNORE_TIME = 600
+_limiters = {
+    chat_type: RateLimiter(
+        limit,
+        window,
+        ignore,
+        max_keys=config.RATE_LIMIT_MAX_TRACKED,
+    )
+    for chat_type, (limit, window, ignore) in config.RATE_LIMITS.items()
+}
 
-_pm_hits = {}
-_pm_ignored = {}
 
+def _chat_type(event) -> str:
+    return "private" if event.is_private else "group"
 
-def _rate_limited(user_id: int) -> bool:
-    now = time.time()
 
-    until = _pm_ignored.get(user_id)
-    if until and until > now:
+def _rate_limited(event) -> bool:
+    limiter = _limiters.get(_chat_type(event))
+    if not limiter:
+        return False
+    return limiter.hit(event.sender_id)
+
+
+# -------------------------------------------------
+# Command routing
+# -------------------------------------------------
+
+def command(path: str):
+    """
+    Mark a plugin function as the handler for a command path,
+    e.g. ``@command("fwd add")``. The loader registers it directly,
+    so it receives only the arguments after the path.
+    """
+
+    def decorator(fn):
+        fn._command = " ".join(path.lower().split())
+        return fn
+
+    return decorator
+
+
+_REGEX_FLAGS = ((re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"), (re.VERBOSE, "x"))
+
+
+def _compile_trigger(trigger):
+    """
+    Normalize a raw handler trigger:
+    str -> literal prefix, re.Pattern / callable(text) -> as is.
+    Patterns are matched at the start of the text, like re.match.
+    """
+    if trigger is None or isinstance(trigger, re.Pattern):
+        return trigger
+    if isinstance(trigger, str):
+        return re.compile(re.escape(trigger))
+    if callable(trigger):
+        return trigger
+    raise TypeError(f"Unsupported raw trigger: {trigger!r}")
+
+
+def _trigger_matches(trigger, text: str) -> bool:
+    if trigger is None:
         return True
-    elif until:
-        _pm_ignored.pop(user_id, None)
+    if isinstance(trigger, re.Pattern):
+        return trigger.match(text) is not None
+    return bool(trigger(text))
+
+
+def _inline(pattern: re.Pattern) -> str:
+    flags = "".join(c for f, c in _REGEX_FLAGS if pattern.flags & f)
+    if flags:
+        return f"(?{flags}:{pattern.pattern})"
+    return f"(?:{pattern.pattern})"
 
-    hits = _pm_hits.setdefault(user_id, [])
-    hits[:] = [t for t in hits if now - t < PM_RATE_WINDOW]
-    hits.append(now)
 
-    if len(hits) > PM_RATE_LIMIT:
-        _pm_ignored[user_id] = now + PM_IGNORE_TIME
-        _pm_hits.pop(user_id, None)
+def _nestable(pattern: re.Pattern) -> bool:
+    # e.g. global inline flags like (?i) cannot be wrapped in a group
+    try:
+        re.compile(_inline(pattern))
         return True
+    except re.error:
+        return False
+
+
+def assistant_pm(order: int = 100):
+    """
+    Mark a plugin function as an assistant PM hook. Hooks run in
+    ascending order; returning True stops the remaining hooks.
+    """
+
+    def decorator(fn):
+        fn._assistant_pm = True
+        fn._assistant_pm_order = order
+        return fn
+
+    return decorator
 
-    return False
+
+class _Route:
+    __slots__ = ("children", "command", "handler")
+
+    def __init__(self):
+        self.children = {}
+        self.command = None
+        self.handler = None
+
+
+class CancelToken:
+    """
+    Cooperative cancellation flag handed to commands as event.cancel_token.
+    Long loops should check it and stop early; the task is hard-cancelled
+    if it is still running CANCEL_GRACE seconds after the flag is set.
+    """
+
+    __slots__ = ("cancelled",)
+
+    def __init__(self):
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise asyncio.CancelledError()
+
+
+class Job:
+    __slots__ = (
+        "id", "command", "prefix", "chat_id", "created",
+        "running", "timed_out", "token", "task",
+    )
+
+    def __init__(self, job_id: int, command: str, chat_id, prefix: str = "."):
+        self.id = job_id
+        self.command = command
+        self.prefix = prefix  # "." userbot, "/" assistant bot
+        self.chat_id = chat_id
+        self.created = time.time()
+        self.running = False
+        self.timed_out = False
+        self.token = CancelToken()
+        self.task = None
 
 
 # -------------------------------------------------
@@ -48,18 +168,183 @@ def _rate_limited(user_id: int) -> bool:
 
 class Dispatcher:
     def __init__(self):
-        self.commands = {}
-        self.raw_handlers = []  # 🔥 NEW
+        self.commands = {}  # "fwd add" -> handler
+        self.raw_handlers = []  # [(handler, trigger)]
+        self.raw_stats = {"rejected": 0, "passed": 0}
+        self.pm_hooks = []  # [(order, name, handler)], kept sorted
+        self.options = {}  # command path -> __plugin__ limits
+        self._routes = _Route()
+
+        # Running command tasks
+        self.jobs = {}  # job id -> Job
+        self._job_ids = itertools.count(1)
+        self._slots = None  # global semaphore, created on first use
+        self._command_slots = {}
+        self._chat_locks = {}  # chat_id -> [lock, users]
+
+        # Combined raw prefilter (rebuilt on register_raw)
+        self._raw_matcher = None
+        self._raw_predicates = []
+        self._raw_always = False
 
     # ---------------------------------------------
     # Register commands
     # ---------------------------------------------
-    def register(self, command: str, handler):
-        self.commands[command.lower()] = handler
+    def register(self, command: str, handler, options: dict | None = None):
+        path = command.lower().split()
+        if not path:
+            return
+
+        node = self._routes
+        for word in path:
+            child = node.children.get(word)
+            if child is None:
+                child = node.children[word] = _Route()
+            node = child
+
+        node.command = " ".join(path)
+        node.handler = handler
+        self.commands[node.command] = handler
+        self.options[node.command] = options or {}
+        self._command_slots.pop(node.command, None)
+
+    def unregister(self, command: str):
+        path = command.lower().split()
+        node, trail = self._routes, []
+        for word in path:
+            child = node.children.get(word)
+            if child is None:
+                return
+            trail.append((node, word))
+            node = child
+
+        node.command = node.handler = None
+        name = " ".join(path)
+        self.commands.pop(name, None)
+        self.options.pop(name, None)
+        self._command_slots.pop(name, None)
+
+        # Prune branches that no longer lead to a handler
+        for parent, word in reversed(trail):
+            child = parent.children[word]
+            if child.handler or child.children:
+                break
+            del parent.children[word]
+
+    # ---------------------------------------------
+    # Register raw handlers (like sed)
+    # ---------------------------------------------
+    def register_raw(self, handler, trigger=None):
+        """
+        trigger: prefix string, compiled regex or predicate(text).
+        Handlers without a trigger run for every outgoing message.
+        """
+        handlers = self.raw_handlers + [(handler, _compile_trigger(trigger))]
+        self._build_raw_filter(handlers)
+        self.raw_handlers = handlers
+
+    def _build_raw_filter(self, handlers=None):
+        triggers = [t for _, t in (self.raw_handlers if handlers is None else handlers)]
+
+        # Group-free patterns share one alternation; patterns with groups
+        # or backreferences would clash (duplicate names, shifted \1)
+        combined, separate = [], []
+        for t in triggers:
+            if isinstance(t, re.Pattern):
+                (separate if t.groups or not _nestable(t) else combined).append(t)
+
+        matcher = None
+        if combined:
+            try:
+                matcher = re.compile("|".join(_inline(p) for p in combined))
+            except re.error:
+                separate += combined
+
+        self._raw_always = any(t is None for t in triggers)
+        self._raw_predicates = [
+            t for t in triggers
+            if t is not None and not isinstance(t, re.Pattern)
+        ] + [p.match for p in separate]
+        self._raw_matcher = matcher
+
+    def _raw_candidate(self, text: str) -> bool:
+        if self._raw_always:
+            return True
+        if self._raw_matcher and self._raw_matcher.match(text):
+            return True
+        return any(predicate(text) for predicate in self._raw_predicates)
+
+    # ---------------------------------------------
+    # Register assistant PM hooks
+    # ---------------------------------------------
+    def register_pm(self, handler, order: int = 100, name: str | None = None):
+        name = name or f"{handler.__module__}.{handler.__qualname__}"
+        hooks = [h for h in self.pm_hooks if h[1] != name]
+        hooks.append((order, name, handler))
+        hooks.sort(key=lambda h: (h[0], h[1]))
+        self.pm_hooks = hooks
+
+    # ---------------------------------------------
+    # Drop everything a plugin module registered
+    # ---------------------------------------------
+    def unregister_module(self, module_name: str) -> dict:
+        """
+        Remove the commands, raw handlers and PM hooks defined in
+        `module_name`. Returns them so restore() can put them back.
+        """
+        def owned(handler):
+            return getattr(handler, "__module__", None) == module_name
+
+        removed = {
+            "commands": [
+                (path, handler, self.options.get(path))
+                for path, handler in self.commands.items()
+                if owned(handler)
+            ],
+            "raw": [entry for entry in self.raw_handlers if owned(entry[0])],
+            "pm": [hook for hook in self.pm_hooks if owned(hook[2])],
+        }
+
+        for path, _, _ in removed["commands"]:
+            self.unregister(path)
+
+        if removed["raw"]:
+            self.raw_handlers = [
+                entry for entry in self.raw_handlers if not owned(entry[0])
+            ]
+            self._build_raw_filter()
+
+        if removed["pm"]:
+            self.pm_hooks = [h for h in self.pm_hooks if not owned(h[2])]
+
+        return removed
+
+    def restore(self, removed: dict):
+        for path, handler, options in removed["commands"]:
+            self.register(path, handler, options)
+
+        if removed["raw"]:
+            self.raw_handlers.extend(removed["raw"])
+            self._build_raw_filter()
+
+        for order, name, handler in removed["pm"]:
+            self.register_pm(handler, order, name)
+
+    # ---------------------------------------------
+    # Resolve longest matching command path
+    # ---------------------------------------------
+    def resolve(self, parts):
+        node = self._routes
+        match = None
+
+        for depth, word in enumerate(parts, 1):
+            node = node.children.get(word.lower())
+            if node is None:
+                break
+            if node.handler:
+                match = (node.command, node.handler, depth)
 
-    # 🔥 NEW: register raw handler (like sed)
-    def register_raw(self, handler):
-        self.raw_handlers.append(handler)
+        return match
 
     # ---------------------------------------------
     # Bind clients
@@ -91,17 +376,24 @@ class Dispatcher:
             clear_afk()
             log_event("AFK", "I’m back online")
 
-        # 🔥 RAW HANDLERS FIRST
-        for handler in self.raw_handlers:
-            try:
-                handled = await handler(event)
-                if handled:
-                    return
-            except Exception:
-                log_event(
-                    "Raw Handler Error",
-                    traceback.format_exc(limit=6),
-                )
+        # 🔥 RAW HANDLERS FIRST (one prefilter scan for plain messages)
+        if self._raw_candidate(text):
+            self.raw_stats["passed"] += 1
+
+            for handler, trigger in self.raw_handlers:
+                if not _trigger_matches(trigger, text):
+                    continue
+                try:
+                    handled = await handler(event)
+                    if handled:
+                        return
+                except Exception:
+                    log_event(
+                        "Raw Handler Error",
+                        traceback.format_exc(limit=6),
+                    )
+        else:
+            self.raw_stats["rejected"] += 1
 
         await self._handle(event, ".")
 
@@ -112,20 +404,19 @@ class Dispatcher:
         if config.RUN_MODE == "user":
             return
 
+        if event.sender_id != config.OWNER_ID and _rate_limited(event):
+            return
+
         if event.is_private:
-            if event.sender_id != config.OWNER_ID:
-                if _rate_limited(event.sender_id):
-                    return
-
-            for handler in self.commands.values():
-                if getattr(handler, "_assistant_pm", False):
-                    try:
-                        await handler(event, [])
-                    except Exception:
-                        log_event(
-                            "Assistant Error",
-                            traceback.format_exc(limit=6),
-                        )
+            for _, _, hook in self.pm_hooks:
+                try:
+                    if await hook(event, []):
+                        break
+                except Exception:
+                    log_event(
+                        "Assistant Error",
+                        traceback.format_exc(limit=6),
+                    )
 
             if event.sender_id == config.OWNER_ID:
                 await self._handle(event, "/")
@@ -143,24 +434,141 @@ class Dispatcher:
         if not text.startswith(prefix):
             return
 
-        parts = text[len(prefix):].strip().split()
+        parts = text[len(prefix):].split()
         if not parts:
             return
 
-        command = parts[0].lower()
-        args = parts[1:]
+        route = self.resolve(parts)
+        if not route:
+            return
+
+        command, handler, depth = route
+        args = parts[depth:]
+
+        # Resolved command path, so handlers don't re-split raw_text
+        event.command = command
+
+        job = self._spawn(command, handler, event, args, prefix)
+        event.cancel_token = job.token
+        return job
+
+    # ---------------------------------------------
+    # SUPERVISED COMMAND TASKS
+    # ---------------------------------------------
+    def _spawn(self, command, handler, event, args, prefix=".") -> Job:
+        job = Job(next(self._job_ids), command, event.chat_id, prefix)
+        job.task = asyncio.create_task(self._run(job, handler, event, args))
+        self.jobs[job.id] = job
+        job.task.add_done_callback(lambda _: self.jobs.pop(job.id, None))
+        return job
+
+    async def _run(self, job: Job, handler, event, args):
+        options = self.options.get(job.command, {})
+
+        # Control commands (e.g. .jobs cancel) must never wait behind
+        # the commands they act on: no chat lock, no slots
+        if not options.get("supervised", True):
+            job.running = True
+            await self._execute(job, handler, event, args, options)
+            return
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(config.MAX_CONCURRENT_COMMANDS)
+
+        slot = self._command_slots.get(job.command)
+        if slot is None:
+            slot = self._command_slots[job.command] = asyncio.Semaphore(
+                options.get("concurrency", config.COMMAND_CONCURRENCY)
+            )
 
-        handler = self.commands.get(command)
-        if not handler:
+        # Chat lock first so commands in one chat start in order,
+        # without holding a global slot while they wait
+        async with self._chat_lock(job.chat_id, options):
+            async with slot, self._slots:
+                job.running = True
+                await self._execute(job, handler, event, args, options)
+
+    @asynccontextmanager
+    async def _chat_lock(self, chat_id, options):
+        if not options.get("ordered", config.ORDERED_CHATS):
+            yield
             return
 
+        entry = self._chat_locks.get(chat_id)
+        if entry is None:
+            entry = self._chat_locks[chat_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+
         try:
-            await handler(event, args)
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                self._chat_locks.pop(chat_id, None)
+
+    async def _execute(self, job: Job, handler, event, args, options):
+        timeout = options.get("timeout", config.COMMAND_TIMEOUT)
+        deadline = None
+        if timeout:
+            deadline = asyncio.get_running_loop().call_later(
+                timeout, self._expire, job
+            )
+
+        timed = LoopTimer(handler(event, args))
+        start = time.perf_counter()
+        error = False
+
+        try:
+            await timed
+        except asyncio.CancelledError:
+            if not job.timed_out:
+                raise
         except Exception as e:
+            error = True
             log_event(
                 "Command Error",
                 f"{event.raw_text}\n{type(e).__name__}: {e}",
             )
+        finally:
+            if deadline:
+                deadline.cancel()
+            metrics.record(
+                job.command,
+                time.perf_counter() - start,
+                timed.busy,
+                error,
+                timeout=job.timed_out,
+            )
+
+        # Also when the handler stopped itself via event.cancel_token
+        if job.timed_out:
+            log_event("Command Timeout", f"{event.raw_text}\nAfter {timeout}s")
+            try:
+                await respond(event, f"⏱ `{job.prefix}{job.command}` timed out.")
+            except Exception:
+                pass
+
+    def _expire(self, job: Job):
+        job.timed_out = True
+        self._stop(job)
+
+    def _stop(self, job: Job):
+        # Ask nicely first, then hard-cancel after the grace period
+        job.token.cancel()
+        if not job.running:
+            job.task.cancel()
+            return
+        asyncio.get_running_loop().call_later(
+            config.CANCEL_GRACE, job.task.cancel
+        )
+
+    def cancel_job(self, job_id: int) -> bool:
+        job = self.jobs.get(job_id)
+        if not job:
+            return False
+        self._stop(job)
+        return True
 
 
-dispatcher = Dispatcher()
\ No newline at end of file
+dispatcher = Dispatcher()
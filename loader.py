@@ -1,18 +1,151 @@
+import ast
+import asyncio
+import hashlib
 import importlib
 import importlib.util
 import subprocess
 import sys
+import time
 from pathlib import Path
 
 from dispatcher import dispatcher
 from config import config
+from db import manifest
 from utils.logger import log, log_event
+from utils.profiler import profiler
+
+
+# -------------------------------------------------
+# Static plugin inspection (no code is executed)
+# -------------------------------------------------
+_EAGER_CALLS = {"register", "register_raw", "register_pm"}
+
+# Bump when inspect_source() output changes so cached manifests re-scan
+INFO_VERSION = 2
+
+# Import name -> pip distribution, where they differ
+DISTRIBUTIONS = {
+    "bs4": "beautifulsoup4",
+    "cv2": "opencv-python",
+    "dotenv": "python-dotenv",
+    "PIL": "Pillow",
+    "yaml": "PyYAML",
+    "yt_dlp": "yt-dlp",
+    "Crypto": "pycryptodome",
+    "sklearn": "scikit-learn",
+}
+
+
+def _call_name(node) -> str | None:
+    func = node.func if isinstance(node, ast.Call) else node
+    if isinstance(func, ast.Attribute):
+        return func.attr
+    if isinstance(func, ast.Name):
+        return func.id
+    return None
+
+
+def inspect_source(source: str, filename: str = "<plugin>") -> dict | None:
+    """
+    Read a plugin's __plugin__ dict, sub-command routes, top-level
+    imports and load hints from its AST. "meta" is None if there is no
+    literal __plugin__; returns None only for unparsable source.
+    """
+    try:
+        tree = ast.parse(source, filename)
+    except SyntaxError:
+        return None
+
+    meta = None
+    routes = []
+    imports = set()
+    has_handler = False
+    eager = False
+
+    for node in tree.body:
+        # Unconditional absolute imports only (try/except ones are optional)
+        if isinstance(node, ast.Import):
+            imports.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and not node.level and node.module:
+            imports.add(node.module.split(".")[0])
+
+        if isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name) and target.id == "__plugin__":
+                    try:
+                        meta = ast.literal_eval(node.value)
+                    except (ValueError, TypeError, SyntaxError):
+                        meta = None
+
+                # fn._assistant_pm = True
+                if isinstance(target, ast.Attribute) and target.attr == "_assistant_pm":
+                    eager = True
+
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            if node.name == "handler":
+                has_handler = True
+            if node.name == "init":
+                eager = True
+
+            for deco in node.decorator_list:
+                name = _call_name(deco)
+                if name == "assistant_pm":
+                    eager = True
+                elif (
+                    name == "command"
+                    and isinstance(deco, ast.Call)
+                    and deco.args
+                    and isinstance(deco.args[0], ast.Constant)
+                ):
+                    routes.append(" ".join(str(deco.args[0].value).lower().split()))
+
+        # Module-level dispatcher.register*(...) calls
+        elif isinstance(node, ast.Expr) and isinstance(node.value, ast.Call):
+            if _call_name(node.value) in _EAGER_CALLS:
+                eager = True
+
+    if not isinstance(meta, dict):
+        meta = None
+
+    return {
+        "version": INFO_VERSION,
+        "meta": meta,
+        "routes": routes,
+        "imports": sorted(imports),
+        "has_handler": has_handler,
+        # Explicit "lazy" wins; otherwise anything with side effects is eager
+        "lazy": bool(meta) and meta.get("lazy", not eager),
+    }
+
+
+def _command_limits(limits: dict, path: str) -> dict | None:
+    """
+    A command's __plugin__ limits on top of the plugin-wide "*" entry.
+    """
+    merged = {**limits.get("*", {}), **limits.get(path, {})}
+    return merged or None
+
+
+def _module_name(file: Path) -> str:
+    return ".".join(file.with_suffix("").parts)
+
+
+def _normalize_commands(commands_meta) -> dict:
+    if isinstance(commands_meta, list):
+        return {cmd: "" for cmd in commands_meta}
+    if isinstance(commands_meta, dict):
+        return commands_meta
+    return {}
 
 
 class Loader:
     def __init__(self):
         self.path = Path(config.PLUGIN_PATH)
         self.plugins = {}  # plugin_name -> metadata
+        self.lazy = {}  # module_name -> [stub command paths]
+        self.files = {}  # plugin path -> (mtime, size) at last (re)load
+        self._failures = None  # collected during load() for one summary
+        self._watcher = None
 
     # -------------------------------------------------
     # Check if python module is already installed
@@ -26,16 +159,16 @@ class Loader:
     # -------------------------------------------------
     # Install python dependency
     # -------------------------------------------------
-    def _install_package(self, package: str) -> bool:
+    def _install_package(self, *packages: str) -> bool:
         try:
             subprocess.check_call(
-                [sys.executable, "-m", "pip", "install", package],
+                [sys.executable, "-m", "pip", "install", *packages],
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL,
             )
             return True
         except Exception as e:
-            log.error(f"Failed to install dependency '{package}': {e}")
+            log.error(f"Failed to install {', '.join(packages)}: {e}")
             return False
 
     # -------------------------------------------------
@@ -48,136 +181,483 @@ class Loader:
 
         log.info("Loading plugins...")
 
-        for file in self.path.rglob("*.py"):
-            if file.name.startswith("_"):
-                continue
+        entries = []
+
+        with profiler.phase("loader.scan"):
+            cached = manifest.get_all()
 
-            module_name = ".".join(file.with_suffix("").parts)
-            module = None
+            for file in self.path.rglob("*.py"):
+                if file.name.startswith("_"):
+                    continue
+
+                module_name = _module_name(file)
 
-            # ---------------------------------------------
-            # Import with auto dependency resolution
-            # ---------------------------------------------
-            while True:
                 try:
+                    info = self._inspect(file, module_name, cached.get(str(file)))
+                except OSError:
+                    info = None
+
+                entries.append((str(file), module_name, info))
+
+            manifest.prune(path for path, _, _ in entries)
+
+        # ---------------------------------------------
+        # Install every missing dependency in one go
+        # ---------------------------------------------
+        with profiler.phase("loader.dependencies"):
+            self._resolve_dependencies(entries)
+
+        self._failures = []
+        with profiler.phase("loader.register"):
+            for _, module_name, info in entries:
+                # -----------------------------------------
+                # Lazy plugins: register stubs from metadata only
+                # -----------------------------------------
+                if (
+                    info
+                    and info["lazy"]
+                    and info["has_handler"]
+                    and module_name not in sys.modules
+                    and self._register_stubs(module_name, info)
+                ):
+                    continue
+
+                self.import_plugin(module_name)
+
+        failures, self._failures = self._failures, None
+
+        # -------------------------------------------------
+        # Startup summary (SYNC)
+        # -------------------------------------------------
+        log_event(
+            event="Plugins Loaded",
+            details=(
+                f"{len(self.plugins)} plugins loaded successfully "
+                f"({len(self.lazy)} deferred until first use)"
+            ),
+        )
+
+        if failures:
+            log_event(
+                event="Plugins failed to load",
+                details="\n".join(
+                    f"• {module_name}: {error}" for module_name, error in failures
+                ),
+            )
+
+    # -------------------------------------------------
+    # Batch dependency resolution (one pip run)
+    # -------------------------------------------------
+    def _resolve_dependencies(self, entries):
+        wanted = {}  # top-level module -> [plugin modules]
+        for _, module_name, info in entries:
+            for name in (info or {}).get("imports", []):
+                if name not in sys.stdlib_module_names:
+                    wanted.setdefault(name, []).append(module_name)
+
+        missing = sorted(name for name in wanted if not self._is_installed(name))
+        if not missing:
+            return
+
+        packages = [DISTRIBUTIONS.get(name, name) for name in missing]
+        log.warning(f"Missing dependencies: {', '.join(packages)}, installing...")
+
+        if self._install_package(*packages):
+            importlib.invalidate_caches()
+            log_event(
+                event="Dependencies Installed",
+                details="\n".join(
+                    f"{pkg} (for {', '.join(wanted[name])})"
+                    for name, pkg in zip(missing, packages)
+                ),
+            )
+
+    # -------------------------------------------------
+    # Manifest-backed inspection (re-parse changed files only)
+    # -------------------------------------------------
+    def _inspect(self, file: Path, module_name: str, row):
+        path = str(file)
+        stat = file.stat()
+        self.files[path] = (stat.st_mtime, stat.st_size)
+
+        info = manifest.get_info(row)
+        current = row and (info is None or info.get("version") == INFO_VERSION)
+
+        if current and row["mtime"] == stat.st_mtime and row["size"] == stat.st_size:
+            return info
+
+        source = file.read_bytes()
+        digest = hashlib.sha256(source).hexdigest()
+
+        if current and row["hash"] == digest and row["module"] == module_name:
+            manifest.touch(path, stat.st_mtime, stat.st_size)
+            return info
+
+        info = inspect_source(source.decode("utf-8", errors="ignore"), path)
+        manifest.save(path, module_name, stat.st_mtime, stat.st_size, digest, info)
+        log.info(f"Scanned plugin: {module_name}")
+        return info
+
+    # -------------------------------------------------
+    # Import, init and register a single plugin
+    # -------------------------------------------------
+    def import_plugin(self, module_name: str, reload: bool = False):
+        self.lazy.pop(module_name, None)
+        module = None
+        # A lazy plugin's first import still counts as a load cost
+        reload = reload and module_name in sys.modules
+        start = time.perf_counter()
+
+        # ---------------------------------------------
+        # Import with auto dependency resolution
+        # ---------------------------------------------
+        while True:
+            try:
+                if reload and module_name in sys.modules:
+                    module = importlib.reload(sys.modules[module_name])
+                else:
                     module = importlib.import_module(module_name)
-                    break
-
-                except ModuleNotFoundError as e:
-                    missing = e.name
-
-                    if self._is_installed(missing):
-                        log.error(
-                            f"Dependency '{missing}' already installed but import failed "
-                            f"for {module_name}"
-                        )
-                        self._log_plugin_failure(module_name, e)
-                        module = None
-                        break
-
-                    log.warning(
-                        f"Missing dependency '{missing}' for {module_name}, installing..."
-                    )
+                break
 
-                    if not self._install_package(missing):
-                        self._log_plugin_failure(module_name, e)
-                        module = None
-                        break
+            except ModuleNotFoundError as e:
+                missing = e.name
 
-                    log_event(
-                        event="Dependency Installed",
-                        details=f"{missing} installed for {module_name}",
+                if self._is_installed(missing):
+                    log.error(
+                        f"Dependency '{missing}' already installed but import failed "
+                        f"for {module_name}"
                     )
-
-                except Exception as e:
-                    log.error(f"Failed to load plugin: {module_name}")
-                    log.error(str(e))
                     self._log_plugin_failure(module_name, e)
-                    module = None
-                    break
+                    return None
 
-            if not module:
-                continue
+                log.warning(
+                    f"Missing dependency '{missing}' for {module_name}, installing..."
+                )
 
-            # ---------------------------------------------
-            # Auto-init plugin (DB / setup hook)
-            # ---------------------------------------------
-            init_fn = getattr(module, "init", None)
-            if callable(init_fn):
-                try:
-                    init_fn()
-                    log.info(f"Initialized plugin: {module_name}")
-                except Exception as e:
-                    log.error(f"Init failed for plugin: {module_name}")
-                    log.error(str(e))
+                if not self._install_package(DISTRIBUTIONS.get(missing, missing)):
                     self._log_plugin_failure(module_name, e)
-                    continue
+                    return None
 
-            # ---------------------------------------------
-            # Register NORMAL command plugins (unchanged)
-            # ---------------------------------------------
-            try:
-                meta = getattr(module, "__plugin__", None)
-                handler = getattr(module, "handler", None)
-
-                if meta and handler:
-                    name = meta.get("name")
-                    category = meta.get("category", "misc")
-                    description = meta.get("description", "").strip()
-                    commands_meta = meta.get("commands", {})
-
-                    if name and commands_meta:
-                        if isinstance(commands_meta, list):
-                            commands = {cmd: "" for cmd in commands_meta}
-                        elif isinstance(commands_meta, dict):
-                            commands = commands_meta
-                        else:
-                            commands = {}
-
-                        if commands:
-                            self.plugins[name.lower()] = {
-                                "name": name,
-                                "category": category,
-                                "description": description,
-                                "commands": commands,
-                            }
-
-                            for cmd in commands.keys():
-                                dispatcher.register(cmd, handler)
-
-                            log.info(f"Loaded plugin: {name}")
+                log_event(
+                    event="Dependency Installed",
+                    details=f"{missing} installed for {module_name}",
+                )
 
             except Exception as e:
-                log.error(f"Failed to register plugin: {module_name}")
+                log.error(f"Failed to load plugin: {module_name}")
                 log.error(str(e))
                 self._log_plugin_failure(module_name, e)
+                return None
 
-            # ---------------------------------------------
-            # 🔥 REGISTER ASSISTANT PM HANDLERS (NEW)
-            # ---------------------------------------------
-            for attr in dir(module):
-                fn = getattr(module, attr)
-                if callable(fn) and getattr(fn, "_assistant_pm", False):
-                    dispatcher.register(
-                        f"__assistant_pm__{module_name}.{attr}",
-                        fn,
-                    )
-                    log.info(
-                        f"Registered assistant PM handler: {module_name}.{attr}"
-                    )
+        # ---------------------------------------------
+        # Auto-init plugin (DB / setup hook)
+        # ---------------------------------------------
+        import_time = time.perf_counter() - start
+        init_time = None
 
-        # -------------------------------------------------
-        # Startup summary (SYNC)
-        # -------------------------------------------------
-        log_event(
-            event="Plugins Loaded",
-            details=f"{len(self.plugins)} plugins loaded successfully",
+        init_fn = getattr(module, "init", None)
+        if callable(init_fn):
+            start = time.perf_counter()
+            try:
+                init_fn()
+                log.info(f"Initialized plugin: {module_name}")
+            except Exception as e:
+                log.error(f"Init failed for plugin: {module_name}")
+                log.error(str(e))
+                self._log_plugin_failure(module_name, e)
+                return None
+            init_time = time.perf_counter() - start
+
+        profiler.plugin(module_name, import_time, init_time, reload=reload)
+
+        manifest.mark_imported(module_name, callable(init_fn))
+        self._register(module_name, module)
+        return module
+
+    # -------------------------------------------------
+    # Register NORMAL command plugins
+    # -------------------------------------------------
+    def _register(self, module_name: str, module):
+        try:
+            meta = getattr(module, "__plugin__", None)
+            handler = getattr(module, "handler", None)
+
+            if meta and handler:
+                name = meta.get("name")
+                commands = _normalize_commands(meta.get("commands", {}))
+
+                if name and commands:
+                    self._add_plugin(module_name, meta, commands)
+
+                    # Sub-handlers marked with @command("base sub")
+                    routes = {
+                        fn._command: fn
+                        for fn in vars(module).values()
+                        if callable(fn) and getattr(fn, "_command", None)
+                    }
+
+                    # Paths without a sub-handler fall back to the
+                    # plugin handler on their base word, which then
+                    # receives the subcommand as args[0]
+                    limits = meta.get("limits", {})
+
+                    for cmd in commands.keys():
+                        base = cmd.split()[0]
+                        dispatcher.register(base, handler, _command_limits(limits, base))
+
+                    for path, fn in routes.items():
+                        dispatcher.register(path, fn, _command_limits(limits, path))
+
+                    log.info(f"Loaded plugin: {name}")
+
+        except Exception as e:
+            log.error(f"Failed to register plugin: {module_name}")
+            log.error(str(e))
+            self._log_plugin_failure(module_name, e)
+
+        # ---------------------------------------------
+        # 🔥 REGISTER ASSISTANT PM HANDLERS (NEW)
+        # ---------------------------------------------
+        for attr in dir(module):
+            fn = getattr(module, attr)
+            if callable(fn) and getattr(fn, "_assistant_pm", False):
+                dispatcher.register_pm(
+                    fn,
+                    order=getattr(fn, "_assistant_pm_order", 100),
+                    name=f"{module_name}.{attr}",
+                )
+                log.info(
+                    f"Registered assistant PM handler: {module_name}.{attr}"
+                )
+
+    def _add_plugin(self, module_name: str, meta: dict, commands: dict):
+        name = meta["name"]
+        self.plugins[name.lower()] = {
+            "name": name,
+            "category": meta.get("category", "misc"),
+            "description": meta.get("description", "").strip(),
+            "commands": commands,
+            "module": module_name,
+        }
+
+    # -------------------------------------------------
+    # Lazy stubs (import on first command use)
+    # -------------------------------------------------
+    def _register_stubs(self, module_name: str, info: dict) -> bool:
+        meta = info["meta"]
+        name = meta.get("name")
+        commands = _normalize_commands(meta.get("commands", {}))
+        if not name or not commands:
+            return False
+
+        self._add_plugin(module_name, meta, commands)
+
+        limits = meta.get("limits", {})
+        paths = {cmd.split()[0] for cmd in commands} | set(info["routes"])
+        stub = self._make_stub(module_name)
+
+        for path in paths:
+            dispatcher.register(path, stub, _command_limits(limits, path))
+
+        self.lazy[module_name] = sorted(paths)
+        log.info(f"Deferred plugin: {name}")
+        return True
+
+    def _make_stub(self, module_name: str):
+        async def lazy_handler(event, args):
+            paths = self.lazy.get(module_name, [])
+            module = self.import_plugin(module_name)
+
+            # Drop stubs the real plugin did not replace
+            for path in paths:
+                if getattr(dispatcher.commands.get(path), "_lazy", False):
+                    dispatcher.unregister(path)
+
+            if module is None:
+                raise RuntimeError(f"Plugin {module_name} failed to load")
+
+            # Re-resolve: the real plugin may route deeper than the stub
+            words = event.command.split() + list(args)
+            route = dispatcher.resolve(words)
+            if not route:
+                return
+
+            command, handler, depth = route
+            event.command = command
+            return await handler(event, words[depth:])
+
+        lazy_handler.__module__ = module_name
+        lazy_handler._lazy = True
+        return lazy_handler
+
+    # -------------------------------------------------
+    # Incremental hot reload
+    # -------------------------------------------------
+    def reload_plugin(self, module_name: str) -> bool:
+        """
+        Swap one plugin for the version on disk. Its commands, raw
+        handlers and PM hooks are replaced; everything else is left
+        alone. If the new version fails, the old one stays registered.
+        """
+        file = Path(*module_name.split(".")).with_suffix(".py")
+        if not file.exists():
+            self.unload_plugin(module_name)
+            return False
+
+        removed = dispatcher.unregister_module(module_name)
+        previous = {
+            key: plugin
+            for key, plugin in self.plugins.items()
+            if plugin["module"] == module_name
+        }
+        for key in previous:
+            del self.plugins[key]
+        stubs = self.lazy.pop(module_name, None)
+
+        try:
+            info = self._inspect(file, module_name, manifest.get_by_module(module_name))
+        except OSError:
+            info = None
+
+        self._resolve_dependencies([(str(file), module_name, info)])
+
+        # Never imported: refreshing its stubs is enough
+        if (
+            info
+            and info["lazy"]
+            and info["has_handler"]
+            and module_name not in sys.modules
+            and self._register_stubs(module_name, info)
+        ):
+            return True
+
+        # Same-second edits of equal size would otherwise hit a stale .pyc,
+        # and new files are invisible until the finder caches are cleared
+        Path(importlib.util.cache_from_source(str(file))).unlink(missing_ok=True)
+        importlib.invalidate_caches()
+
+        if self.import_plugin(module_name, reload=True) is not None:
+            return True
+
+        dispatcher.unregister_module(module_name)
+        dispatcher.restore(removed)
+        self.plugins.update(previous)
+        if stubs:
+            self.lazy[module_name] = stubs
+        return False
+
+    def unload_plugin(self, module_name: str):
+        dispatcher.unregister_module(module_name)
+        self.lazy.pop(module_name, None)
+        for key in [k for k, p in self.plugins.items() if p["module"] == module_name]:
+            del self.plugins[key]
+        sys.modules.pop(module_name, None)
+        log.info(f"Unloaded plugin: {module_name}")
+
+    def changed_files(self) -> tuple[list, list]:
+        """
+        Plugin files added or modified since the last (re)load, and
+        files that were removed.
+        """
+        current = {}
+        for file in self.path.rglob("*.py"):
+            if file.name.startswith("_"):
+                continue
+            try:
+                stat = file.stat()
+            except OSError:
+                continue
+            current[str(file)] = (stat.st_mtime, stat.st_size)
+
+        changed = [p for p, stamp in current.items() if self.files.get(p) != stamp]
+        removed = [p for p in self.files if p not in current]
+        return sorted(changed), removed
+
+    def reload_changed(self) -> dict:
+        """
+        Reload only the plugins whose files changed.
+        Returns {module_name: "reloaded" | "failed" | "removed"}.
+        """
+        changed, removed = self.changed_files()
+        results = {}
+
+        for path in removed:
+            module_name = _module_name(Path(path))
+            self.unload_plugin(module_name)
+            del self.files[path]
+            results[module_name] = "removed"
+
+        for path in changed:
+            module_name = _module_name(Path(path))
+            ok = self.reload_plugin(module_name)
+            results[module_name] = "reloaded" if ok else "failed"
+
+        if removed:
+            manifest.prune(self.files)
+
+        if results:
+            log.info(
+                "Hot reload: "
+                + ", ".join(f"{m} ({state})" for m, state in results.items())
+            )
+        return results
+
+    # -------------------------------------------------
+    # Plugin file watcher (ASYNC)
+    # -------------------------------------------------
+    def start_watcher(self, interval: float):
+        if self._watcher and not self._watcher.done():
+            return  # already running
+
+        self._watcher = asyncio.create_task(self._watch(interval))
+
+    async def _watch(self, interval: float):
+        try:
+            from watchfiles import awatch
+        except ImportError:
+            awatch = None
+
+        log.info(
+            "Watching plugins for changes "
+            + ("(inotify)" if awatch else f"(polling every {interval}s)")
         )
 
+        if awatch:
+            # Batches bursts of events (editor save = several writes)
+            async for _ in awatch(self.path):
+                self._reload_from_watcher()
+            return
+
+        while True:
+            await asyncio.sleep(interval)
+            self._reload_from_watcher()
+
+    def _reload_from_watcher(self):
+        start = time.perf_counter()
+        try:
+            results = self.reload_changed()
+        except Exception as e:
+            log.error(f"Plugin watcher failed: {e}")
+            return
+
+        if results:
+            log_event(
+                event="Plugins Reloaded",
+                details=(
+                    "\n".join(f"{m}: {state}" for m, state in results.items())
+                    + f"\n({(time.perf_counter() - start) * 1000:.0f} ms)"
+                ),
+            )
+
     # -------------------------------------------------
     # Plugin failure logger (SYNC)
     # -------------------------------------------------
     def _log_plugin_failure(self, module_name: str, error: Exception):
+        if self._failures is not None:
+            log.error(f"Plugin failed to load: {module_name}: {error}")
+            self._failures.append((module_name, error))
+            return
+
         log_event(
             event="Plugin failed to load",
             details=f"Plugin: {module_name}\nReason: {error}",
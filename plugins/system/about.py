@@ -48,7 +48,9 @@ async def handler(event, args):
     python_version = sys.version.split()[0]
     os_info = platform.system()
 
-    plugin_count = len(set(dispatcher.commands.values()))
+    plugin_count = len(
+        {h.__module__ for h in dispatcher.commands.values()}
+    )
 
     text = (
         "**System Information**\n\n"
@@ -35,7 +35,7 @@ async def handler(event, args):
     if not await is_admin(event):
         return await respond(event, "You must be an admin to use this command.")
 
-    cmd = event.raw_text.split()[0].lstrip("./").lower()
+    cmd = event.command
     reply = await event.get_reply_message()
 
     try:
@@ -64,6 +64,8 @@ async def handler(event, args):
                     event.chat_id,
                     limit=limit
                 ):
+                    # Stop on timeout / .jobs cancel without deleting a partial batch
+                    event.cancel_token.raise_if_cancelled()
                     msgs.append(msg.id)
 
                 if msgs:
@@ -81,6 +83,7 @@ async def handler(event, args):
                 min_id=reply.id,
                 max_id=event.id
             ):
+                event.cancel_token.raise_if_cancelled()
                 msgs.append(msg.id)
 
             if msgs:
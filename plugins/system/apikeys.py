@@ -30,7 +30,7 @@ async def handler(event, args):
     if not is_owner(event):
         return
 
-    cmd = event.raw_text.split()[0].lstrip("./").lower()
+    cmd = event.command
 
     # ---------------- setapi ----------------
     if cmd == "setapi":
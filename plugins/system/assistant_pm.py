@@ -1,5 +1,6 @@
 from config import config
 from db.core import db
+from dispatcher import assistant_pm
 
 
 __plugin__ = {
@@ -24,7 +25,7 @@ def _key(msg_id: int) -> str:
 async def _resolve_user_from_reply(event):
     msg = await event.get_reply_message()
     while msg:
-        user_id = db.get(_key(msg.id))
+        user_id = await db.aget(_key(msg.id))
         if user_id:
             return int(user_id)
         msg = await msg.get_reply_message()
@@ -34,6 +35,7 @@ async def _resolve_user_from_reply(event):
 # -------------------------------------------------
 # Incoming PM → forward to OWNER
 # -------------------------------------------------
+@assistant_pm(order=10)
 async def assistant_pm_forward(event, args):
     if not _enabled():
         return
@@ -45,12 +47,14 @@ async def assistant_pm_forward(event, args):
         return
 
     forwarded = await event.forward_to(config.OWNER_ID)
-    db.set(_key(forwarded.id), str(event.sender_id))
+    await db.aset(_key(forwarded.id), str(event.sender_id))
+    return True
 
 
 # -------------------------------------------------
 # OWNER reply → send back to user
 # -------------------------------------------------
+@assistant_pm(order=20)
 async def assistant_pm_reply(event, args):
     if not _enabled():
         return
@@ -77,7 +81,4 @@ async def assistant_pm_reply(event, args):
             event.text or "",
         )
 
-
-# Mark handlers for loader discovery
-assistant_pm_forward._assistant_pm = True
-assistant_pm_reply._assistant_pm = True
+    return True
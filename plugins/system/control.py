@@ -4,7 +4,9 @@ import asyncio
 import subprocess
 from pathlib import Path
 
+from clients import clients
 from config import config
+from db.core import db
 from utils.respond import respond
 from utils.logger import log_event
 from db.control import set_action
@@ -61,6 +63,17 @@ def get_changelog():
     return "\n".join(f"`{line}`" for line in lines)
 
 
+async def persist_state():
+    """
+    os.execv skips atexit handlers: write buffered session entities
+    and wait for pending DB writes before replacing the process.
+    """
+    for client in (clients.user, clients.bot):
+        if client:
+            client.session.save()
+    await db.flush()
+
+
 # -------------------------------------------------
 # Handler
 # -------------------------------------------------
@@ -78,7 +91,7 @@ async def handler(event, args):
             "Atlas must be cloned from GitHub to use update."
         )
 
-    cmd = event.raw_text.split()[0].lstrip("./").lower()
+    cmd = event.command
     sub = args[0].lower() if args else None
 
     chat_id = event.chat_id
@@ -99,6 +112,7 @@ async def handler(event, args):
         log_event("Restart Initiated", "Restart requested")
         await asyncio.sleep(1)
 
+        await persist_state()
         os.execv(sys.executable, [sys.executable] + sys.argv)
 
     # -------------------------------------------------
@@ -152,4 +166,5 @@ async def handler(event, args):
             return await respond(event, f"Update failed:\n`{e}`")
 
         await asyncio.sleep(1)
+        await persist_state()
         os.execv(sys.executable, [sys.executable] + sys.argv)
\ No newline at end of file
@@ -69,7 +69,7 @@ async def handler(event, args):
     if not is_owner(event):
         return
 
-    command = event.raw_text.split()[0].lstrip("./")
+    command = event.command
     code = get_code(event, args)
 
     if not code:
@@ -0,0 +1,84 @@
+import time
+
+from config import config
+from dispatcher import dispatcher, command
+from utils.formatting import human_time
+from utils.respond import respond
+from utils.logger import log_event
+
+
+__plugin__ = {
+    "name": "Jobs",
+    "category": "system",
+    "description": "List and cancel running command tasks",
+    "commands": {
+        "jobs": "List running and queued commands",
+        "jobs cancel": "Cancel a command by job ID (or `all`)",
+    },
+    # Must not queue behind the jobs it is meant to cancel
+    "limits": {
+        "*": {"supervised": False},
+    },
+}
+
+
+def is_owner(event):
+    return event.sender_id == config.OWNER_ID
+
+
+def _other_jobs():
+    return [
+        job for job in dispatcher.jobs.values()
+        if not job.command.startswith("jobs")
+    ]
+
+
+# -------------------------------------------------
+# Handlers
+# -------------------------------------------------
+async def handler(event, args):
+    if not is_owner(event):
+        return
+
+    if args:
+        return await respond(event, "❌ Unknown subcommand. Use `.jobs`.")
+
+    jobs = _other_jobs()
+    if not jobs:
+        return await respond(event, "📭 No running commands.")
+
+    now = time.time()
+    text = "⚙️ **Running Commands**\n\n"
+
+    for job in sorted(jobs, key=lambda j: j.id):
+        state = "running" if job.running else "queued"
+        text += (
+            f"🆔 `{job.id}` • `{job.prefix}{job.command}` • {state}\n"
+            f"   chat `{job.chat_id}` • {human_time(now - job.created)}\n"
+        )
+
+    text += "\nUse `.jobs cancel <id|all>`"
+    return await respond(event, text)
+
+
+@command("jobs cancel")
+async def jobs_cancel(event, args):
+    if not is_owner(event):
+        return
+
+    if not args:
+        return await respond(event, "❌ Usage: `.jobs cancel <id|all>`")
+
+    if args[0].lower() == "all":
+        jobs = _other_jobs()
+        for job in jobs:
+            dispatcher.cancel_job(job.id)
+
+        log_event("Jobs Cancelled", f"{len(jobs)} command(s) cancelled")
+        return await respond(event, f"🛑 Cancelled `{len(jobs)}` command(s).")
+
+    if not args[0].isdigit() or not dispatcher.cancel_job(int(args[0])):
+        return await respond(event, "❌ Job not found.")
+
+    log_event("Job Cancelled", f"Job {args[0]}")
+    return await respond(event, f"🛑 **Job `{args[0]}` cancelled.**")
@@ -34,10 +34,8 @@ async def handler(event, args):
     if not is_owner(event):
         return
 
-    raw = event.raw_text.strip().lstrip("./")
-    parts = raw.split()
-    cmd = parts[0].lower()
-    sub = parts[1].lower() if len(parts) > 1 else None
+    cmd = event.command
+    sub = args[0].lower() if args else None
 
     # -------------------------------------------------
     # loggroup alias router
@@ -58,12 +58,12 @@ async def handler(event, args):
     if not is_owner(event):
         return
 
-    text = (event.raw_text or "").strip()
+    cmd = event.command
 
     # -------------------------------------------------
     # .clearlog
     # -------------------------------------------------
-    if text in (".clearlog", "/clearlog"):
+    if cmd == "clearlog":
         clear_logs()
 
         await respond(event, "🧹 **Logs cleared successfully.**")
@@ -77,7 +77,7 @@ async def handler(event, args):
     # -------------------------------------------------
     # .loglevel
     # -------------------------------------------------
-    if text.startswith((".loglevel", "/loglevel")):
+    if cmd == "loglevel":
         if not args:
             await respond(
                 event,
@@ -132,7 +132,7 @@ async def handler(event, args):
     # -------------------------------------------------
     # .log (full)
     # -------------------------------------------------
-    if text in (".log", "/log"):
+    if not args:
         if (
             not LOG_FILE_PATH.exists()
             or LOG_FILE_PATH.stat().st_size == 0
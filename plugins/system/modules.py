@@ -1,9 +1,14 @@
+import time
 from pathlib import Path
 from datetime import datetime
 
 from utils.respond import respond
+from utils.formatting import human_ms
 from config import config
-from loader import loader
+from loader import loader, inspect_source
+from dispatcher import command
+from db import manifest
+from db import profile
 from utils.logger import log_event
 
 
@@ -15,7 +20,8 @@ __plugin__ = {
         "modules": "List installed modules",
         "modules info": "Show detailed module information",
         "modules check": "Validate a module for syntax errors",
-        "modules reload": "Reload all modules",
+        "modules profile": "Show startup and plugin load timings",
+        "modules reload": "Reload changed modules, or one by name",
         "modules upload": "Upload a module file",
         "modules uploadall": "Upload all installed modules",
         "modules install": "Install a module from replied .py file",
@@ -25,6 +31,9 @@ __plugin__ = {
 
 PLUGIN_ROOT = Path(config.PLUGIN_PATH)
 
+# Slowest plugins listed by .modules profile
+TOP_PLUGINS = 15
+
 
 # -------------------------------------------------
 # Helpers
@@ -54,184 +63,330 @@ def extract_plugin_meta_safe(source: str):
     """
     Extract __plugin__ dict without executing module code.
     """
-    namespace = {}
-    try:
-        compiled = compile(source, "<module>", "exec")
-        exec(compiled, {"__builtins__": {}}, namespace)
-    except Exception:
-        return None
-    return namespace.get("__plugin__")
+    info = inspect_source(source)
+    return info["meta"] if info else None
+
+
+def module_name_for(path: Path) -> str:
+    return ".".join(path.with_suffix("").parts)
 
 
-def reload_modules():
-    loader.plugins.clear()
-    loader.load()
+def _fmt_delta(ms: float, previous: float | None) -> str:
+    if previous is None:
+        return ""
+    delta = ms - previous
+    if abs(delta) < 1:
+        return ""
+    return f" ({'+' if delta > 0 else '-'}{human_ms(abs(delta))})"
 
 
 # -------------------------------------------------
-# Handler
+# Handlers
 # -------------------------------------------------
 async def handler(event, args):
     if not is_owner(event):
         return
 
-    module_map = scan_modules()
+    if args:
+        return await respond(event, "❌ Unknown subcommand. Use `.modules`.")
 
     # ---------------- .modules ----------------
-    if not args:
-        cats = {}
-        for p in loader.plugins.values():
-            cats.setdefault(p["category"], []).append(p["name"])
+    cats = {}
+    for p in loader.plugins.values():
+        cats.setdefault(p["category"], []).append(p["name"])
+
+    text = "📦 **Installed Modules**\n\n"
+    for cat in sorted(cats):
+        text += f"**{cat.capitalize()}**\n"
+        for name in sorted(cats[cat]):
+            text += f"• `{name}`\n"
+        text += "\n"
+
+    text += (
+        "Usage:\n"
+        "`.modules info <module>`\n"
+        "`.modules check <module>`\n"
+        "`.modules profile`\n"
+        "`.modules reload [module]`\n"
+        "`.modules upload <module>`\n"
+        "`.modules uploadall`\n"
+        "`.modules install` (reply to .py)"
+    )
+
+    return await respond(event, text.strip())
+
+
+# ---------------- reload ----------------
+@command("modules reload")
+async def modules_reload(event, args):
+    if not is_owner(event):
+        return
 
-        text = "📦 **Installed Modules**\n\n"
-        for cat in sorted(cats):
-            text += f"**{cat.capitalize()}**\n"
-            for name in sorted(cats[cat]):
-                text += f"• `{name}`\n"
-            text += "\n"
+    start = time.perf_counter()
 
-        text += (
-            "Usage:\n"
-            "`.modules info <module>`\n"
-            "`.modules check <module>`\n"
-            "`.modules reload`\n"
-            "`.modules upload <module>`\n"
-            "`.modules uploadall`\n"
-            "`.modules install` (reply to .py)"
-        )
+    if args:
+        name = args[0].lower()
+        path = scan_modules().get(name)
+        if not path:
+            return await respond(event, f"❌ Module `{name}` not found.")
 
-        return await respond(event, text.strip())
+        module_name = module_name_for(path)
+        ok = loader.reload_plugin(module_name)
+        results = {module_name: "reloaded" if ok else "failed"}
+    else:
+        results = loader.reload_changed()
 
-    action = args[0].lower()
+    elapsed = (time.perf_counter() - start) * 1000
 
-    # ---------------- reload ----------------
-    if action == "reload":
-        reload_modules()
-        log_event("Modules Reloaded")
-        return await respond(event, "🔄 **Modules reloaded successfully**")
+    if not results:
+        return await respond(event, "ℹ️ No modules changed since last load.")
 
-    # ---------------- install ----------------
-    if action == "install":
-        reply = await event.get_reply_message()
-        if not reply or not reply.file or not reply.file.name.endswith(".py"):
-            return await respond(
-                event,
-                "❌ Reply to a `.py` module file to install it.",
-            )
+    log_event(
+        "Modules Reloaded",
+        "\n".join(f"{m}: {state}" for m, state in results.items()),
+    )
 
-        source = (await reply.download_media(bytes)).decode(errors="ignore")
+    text = f"🔄 **Reloaded in** `{elapsed:.0f} ms`\n\n"
+    for module_name, state in results.items():
+        icon = {"reloaded": "✅", "removed": "🗑"}.get(state, "❌")
+        text += f"{icon} `{module_name.rsplit('.', 1)[-1]}` — {state}\n"
 
-        ok, error = validate_source(source, reply.file.name)
-        if not ok:
-            return await respond(
-                event,
-                f"❌ **Module validation failed**\n\n"
-                f"`{type(error).__name__}: {error}`",
-            )
+    return await respond(event, text.strip())
 
-        meta = extract_plugin_meta_safe(source)
-        if not meta:
-            return await respond(event, "❌ `__plugin__` metadata not found.")
 
-        name = meta.get("name")
-        category = meta.get("category", "misc")
+# ---------------- install ----------------
+@command("modules install")
+async def modules_install(event, args):
+    if not is_owner(event):
+        return
 
-        if not name:
-            return await respond(event, "❌ Module name missing in metadata.")
+    reply = await event.get_reply_message()
+    if not reply or not reply.file or not reply.file.name.endswith(".py"):
+        return await respond(
+            event,
+            "❌ Reply to a `.py` module file to install it.",
+        )
 
-        filename = f"{name.lower()}.py"
-        target_dir = PLUGIN_ROOT / category
-        target_dir.mkdir(parents=True, exist_ok=True)
-        target_file = target_dir / filename
+    source = (await reply.download_media(bytes)).decode(errors="ignore")
 
-        if target_file.exists():
-            return await respond(
-                event,
-                f"❌ Module `{name}` already exists.",
-            )
+    ok, error = validate_source(source, reply.file.name)
+    if not ok:
+        return await respond(
+            event,
+            f"❌ **Module validation failed**\n\n"
+            f"`{type(error).__name__}: {error}`",
+        )
+
+    meta = extract_plugin_meta_safe(source)
+    if not meta:
+        return await respond(event, "❌ `__plugin__` metadata not found.")
 
-        target_file.write_text(source, encoding="utf-8")
+    name = meta.get("name")
+    category = meta.get("category", "misc")
 
-        reload_modules()
+    if not name:
+        return await respond(event, "❌ Module name missing in metadata.")
 
-        log_event("Module Installed", f"{name} ({category})")
+    filename = f"{name.lower()}.py"
+    target_dir = PLUGIN_ROOT / category
+    target_dir.mkdir(parents=True, exist_ok=True)
+    target_file = target_dir / filename
 
+    if target_file.exists():
         return await respond(
             event,
-            f"✅ **Module installed successfully**\n\n"
-            f"**Name:** `{name}`\n"
-            f"**Category:** `{category}`",
+            f"❌ Module `{name}` already exists.",
         )
 
-    # ---------------- upload ----------------
-    if action == "upload" and len(args) > 1:
-        name = args[1].lower()
-        path = module_map.get(name)
-        if not path:
-            return await respond(event, f"❌ Module `{name}` not found.")
+    target_file.write_text(source, encoding="utf-8")
 
-        await event.client.send_file(
-            event.chat_id,
-            file=path,
-            caption=f"📦 **Module:** `{path.name}`",
+    if not loader.reload_plugin(module_name_for(target_file)):
+        return await respond(
+            event,
+            f"⚠️ Module `{name}` was saved but failed to load. "
+            "Check the log group.",
         )
+
+    log_event("Module Installed", f"{name} ({category})")
+
+    return await respond(
+        event,
+        f"✅ **Module installed successfully**\n\n"
+        f"**Name:** `{name}`\n"
+        f"**Category:** `{category}`",
+    )
+
+
+# ---------------- upload ----------------
+@command("modules upload")
+async def modules_upload(event, args):
+    if not is_owner(event):
         return
 
-    # ---------------- uploadall ----------------
-    if action == "uploadall":
-        files = list(module_map.values())
-        if not files:
-            return await respond(event, "ℹ️ No modules found.")
+    if not args:
+        return await respond(event, "❌ Usage: `.modules upload <module>`")
+
+    name = args[0].lower()
+    path = scan_modules().get(name)
+    if not path:
+        return await respond(event, f"❌ Module `{name}` not found.")
 
-        await event.client.send_file(
-            event.chat_id,
-            files,
-            caption="📦 **All Installed Atlas Modules**",
-        )
+    await event.client.send_file(
+        event.chat_id,
+        file=path,
+        caption=f"📦 **Module:** `{path.name}`",
+    )
+
+
+# ---------------- uploadall ----------------
+@command("modules uploadall")
+async def modules_uploadall(event, args):
+    if not is_owner(event):
         return
 
-    # ---------------- info / check ----------------
-    if action in {"info", "check"}:
-        if len(args) < 2:
-            return await respond(event, f"❌ Usage: `.modules {action} <module>`")
+    files = list(scan_modules().values())
+    if not files:
+        return await respond(event, "ℹ️ No modules found.")
 
-        name = args[1].lower()
-        path = module_map.get(name)
-        if not path:
-            return await respond(event, f"❌ Module `{name}` not found.")
+    await event.client.send_file(
+        event.chat_id,
+        files,
+        caption="📦 **All Installed Atlas Modules**",
+    )
 
-        if action == "info":
-            size_kb = round(path.stat().st_size / 1024, 2)
-            modified = datetime.fromtimestamp(path.stat().st_mtime)
 
-            plugin = loader.plugins.get(name)
+# ---------------- info ----------------
+@command("modules info")
+async def modules_info(event, args):
+    if not is_owner(event):
+        return
 
-            text = (
-                "📦 **Module Info**\n\n"
-                f"**Name:** `{name}`\n"
-                f"**Category:** `{plugin['category'] if plugin else 'unknown'}`\n"
-                f"**Path:** `{path}`\n"
-                f"**Size:** `{size_kb} KB`\n"
-                f"**Modified:** `{modified}`\n"
-            )
+    if not args:
+        return await respond(event, "❌ Usage: `.modules info <module>`")
+
+    name = args[0].lower()
+    path = scan_modules().get(name)
+    if not path:
+        return await respond(event, f"❌ Module `{name}` not found.")
+
+    size_kb = round(path.stat().st_size / 1024, 2)
+    modified = datetime.fromtimestamp(path.stat().st_mtime)
+
+    plugin = loader.plugins.get(name)
+    row = manifest.get_by_module(plugin["module"]) if plugin else None
+
+    text = (
+        "📦 **Module Info**\n\n"
+        f"**Name:** `{name}`\n"
+        f"**Category:** `{plugin['category'] if plugin else 'unknown'}`\n"
+        f"**Path:** `{path}`\n"
+        f"**Size:** `{size_kb} KB`\n"
+        f"**Modified:** `{modified}`\n"
+    )
+
+    if plugin:
+        state = "deferred" if plugin["module"] in loader.lazy else "imported"
+        text += f"**State:** `{state}`\n"
+    if row and row["imported_at"]:
+        text += f"**Last import:** `{row['imported_at']}`\n"
+    if row and row["init_at"]:
+        text += f"**Last init:** `{row['init_at']}`\n"
+
+    if plugin:
+        text += "\n**Commands:**\n"
+        for cmd, desc in plugin["commands"].items():
+            text += f"• `.{cmd}` — {desc or 'No description'}\n"
+
+    return await respond(event, text.strip())
+
+
+# ---------------- check ----------------
+@command("modules check")
+async def modules_check(event, args):
+    if not is_owner(event):
+        return
 
-            if plugin:
-                text += "\n**Commands:**\n"
-                for cmd, desc in plugin["commands"].items():
-                    text += f"• `.{cmd}` — {desc or 'No description'}\n"
+    if not args:
+        return await respond(event, "❌ Usage: `.modules check <module>`")
 
-            return await respond(event, text.strip())
+    name = args[0].lower()
+    path = scan_modules().get(name)
+    if not path:
+        return await respond(event, f"❌ Module `{name}` not found.")
 
-        # action == check
-        ok, error = validate_source(path.read_text(), path.name)
-        if ok:
-            return await respond(event, f"✅ **Module `{name}` is valid**")
+    ok, error = validate_source(path.read_text(), path.name)
+    if ok:
+        return await respond(event, f"✅ **Module `{name}` is valid**")
 
-        return await respond(
-            event,
-            f"❌ **Validation failed**\n\n"
-            f"`{type(error).__name__}: {error}`",
+    return await respond(
+        event,
+        f"❌ **Validation failed**\n\n"
+        f"`{type(error).__name__}: {error}`",
+    )
+
+
+# ---------------- profile ----------------
+@command("modules profile")
+async def modules_profile(event, args):
+    if not is_owner(event):
+        return
+
+    boots = profile.boots(2)
+    if not boots:
+        return await respond(event, "ℹ️ No startup profile recorded yet.")
+
+    current = profile.get(boots[0])
+    previous = profile.get(boots[1]) if len(boots) > 1 else {}
+
+    def costs(entries):
+        plugins = {}
+        for (kind, name), ms in entries.items():
+            if kind in ("import", "init"):
+                plugins.setdefault(name, {"import": 0.0, "init": 0.0})[kind] = ms
+        return plugins
+
+    text = f"⏱ **Startup Profile** (boot `#{boots[0]}`"
+    text += f", vs `#{boots[1]}`)\n\n" if previous else ")\n\n"
+
+    # ---------------- phases ----------------
+    phases = sorted(
+        ((name, ms) for (kind, name), ms in current.items() if kind == "phase"),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+    text += "**Phases**\n"
+    for name, ms in phases:
+        text += (
+            f"• `{name}` `{human_ms(ms)}`"
+            f"{_fmt_delta(ms, previous.get(('phase', name)))}\n"
         )
 
-    # ---------------- fallback ----------------
-    await respond(event, "❌ Unknown subcommand. Use `.modules`.")
\ No newline at end of file
+    # ---------------- plugins ----------------
+    plugins = costs(current)
+    before = costs(previous)
+    ranked = sorted(
+        plugins.items(),
+        key=lambda item: item[1]["import"] + item[1]["init"],
+        reverse=True,
+    )
+    budget = config.PLUGIN_LOAD_BUDGET_MS
+
+    text += "\n**Plugins** (import + init)\n"
+    for module_name, cost in ranked[:TOP_PLUGINS]:
+        total = cost["import"] + cost["init"]
+        old = before.get(module_name)
+        text += (
+            f"• `{module_name.rsplit('.', 1)[-1]}` `{human_ms(total)}`"
+            f" ({human_ms(cost['import'])} + {human_ms(cost['init'])})"
+            f"{_fmt_delta(total, old['import'] + old['init'] if old else None)}"
+            + (" ⚠️" if budget and total > budget else "")
+            + "\n"
+        )
+
+    if len(ranked) > TOP_PLUGINS:
+        text += f"… and `{len(ranked) - TOP_PLUGINS}` more\n"
+
+    if loader.lazy:
+        text += f"\n`{len(loader.lazy)}` plugins not imported yet (lazy)"
+
+    return await respond(event, text.strip())
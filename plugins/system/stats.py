@@ -0,0 +1,120 @@
+import json
+from io import BytesIO
+from datetime import datetime
+
+from config import config
+from db.core import db
+from dispatcher import dispatcher, command
+from utils.metrics import metrics
+from utils.formatting import human_ms
+from utils.respond import respond
+from utils.logger import log_event
+
+
+__plugin__ = {
+    "name": "Stats",
+    "category": "system",
+    "description": "Show per-command latency and error statistics",
+    "commands": {
+        "stats": "Show p50/p95/p99 latency per command",
+        "stats json": "Upload a machine-readable stats dump",
+        "stats reset": "Reset collected statistics",
+    },
+}
+
+
+# Commands listed in .stats; the full set is in .stats json
+TOP_COMMANDS = 15
+
+
+def is_owner(event):
+    return event.sender_id == config.OWNER_ID
+
+
+def snapshot() -> dict:
+    data = metrics.to_dict()
+    data["raw_prefilter"] = dict(dispatcher.raw_stats)
+    data["kv_cache"] = db.cache.to_dict()
+    return data
+
+
+# -------------------------------------------------
+# Handlers
+# -------------------------------------------------
+async def handler(event, args):
+    if not is_owner(event):
+        return
+
+    if args:
+        return await respond(event, "❌ Unknown subcommand. Use `.stats`.")
+
+    since = datetime.fromtimestamp(metrics.since).strftime("%Y-%m-%d %H:%M")
+    raw = dispatcher.raw_stats
+    cache = db.cache.to_dict()
+
+    text = f"📊 **Command Stats** (since `{since}`)\n\n"
+
+    if not metrics.commands:
+        text += "No commands recorded yet.\n"
+
+    # Slowest first, by wall-time p95
+    ranked = sorted(
+        metrics.commands.items(),
+        key=lambda item: item[1].wall.percentile(0.95),
+        reverse=True,
+    )
+
+    for name, stats in ranked[:TOP_COMMANDS]:
+        wall, loop = stats.wall, stats.loop
+        text += (
+            f"• `.{name}` ×{wall.total}"
+            + (f" ⚠️{stats.errors}" if stats.errors else "")
+            + (f" ⏱{stats.timeouts}" if stats.timeouts else "")
+            + "\n"
+            f"  wall `{human_ms(wall.percentile(0.5))}`"
+            f" / `{human_ms(wall.percentile(0.95))}`"
+            f" / `{human_ms(wall.percentile(0.99))}`\n"
+            f"  loop `{human_ms(loop.percentile(0.5))}`"
+            f" / `{human_ms(loop.percentile(0.95))}`"
+            f" / `{human_ms(loop.percentile(0.99))}`\n"
+        )
+
+    if len(ranked) > TOP_COMMANDS:
+        text += f"… and `{len(ranked) - TOP_COMMANDS}` more (`.stats json`)\n"
+
+    text += (
+        "\n(p50 / p95 / p99)\n\n"
+        f"**Raw prefilter:** `{raw['rejected']}` rejected, "
+        f"`{raw['passed']}` passed\n"
+        f"**KV cache:** `{cache['hits']}` hits, `{cache['misses']}` misses "
+        f"(`{cache['hit_rate']:.0%}`), `{cache['entries']}` entries, "
+        f"`{cache['bytes'] // 1024}` KB"
+    )
+
+    return await respond(event, text.strip())
+
+
+@command("stats json")
+async def stats_json(event, args):
+    if not is_owner(event):
+        return
+
+    bio = BytesIO(json.dumps(snapshot(), indent=2).encode())
+    bio.name = "atlas-stats.json"
+
+    await event.client.send_file(
+        event.chat_id,
+        file=bio,
+        caption="📊 **Atlas command stats**",
+    )
+
+
+@command("stats reset")
+async def stats_reset(event, args):
+    if not is_owner(event):
+        return
+
+    metrics.reset()
+    db.cache.reset_stats()
+    log_event("Stats Reset", "Command statistics cleared")
+    return await respond(event, "🧹 **Stats reset.**")
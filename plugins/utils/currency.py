@@ -46,7 +46,7 @@ async def handler(event, args):
             f"Set it using:\n.setapi {REQUIRED_KEY} <your_api_key>",
         )
 
-    cmd = event.raw_text.split()[0].lstrip("./").lower()
+    cmd = event.command
 
     try:
         # .cr format
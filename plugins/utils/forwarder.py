@@ -2,22 +2,39 @@ import json
 import time
 import asyncio
 
-from telethon.errors import FloodWaitError
+from telethon.errors import ChatForwardsRestrictedError, FloodWaitError
 
+from config import config
 from db.core import db
-from utils.respond import respond
-from utils.logger import log_event
+from dispatcher import command
+from utils.respond import respond, MAX_MESSAGE_LENGTH
+from utils.logger import log, log_event
+from utils.entities import warmer
+from utils.ratelimit import TokenBucket
+
+
+# Telegram forwards at most 100 messages per request
+FORWARD_BATCH = 100
+
+# copy = forward without the "Forwarded from" header
+MODES = ("copy", "forward")
 
 
 # -------------------------------------------------
 # Runtime state
 # -------------------------------------------------
-_forward_queue: asyncio.Queue | None = None
-_worker_task: asyncio.Task | None = None
+# dst chat id -> _Lane; created on demand, removed when idle
+_lanes: dict = {}
+
+# Shared by every lane, on top of the per-chat buckets
+_global_bucket = TokenBucket(config.FWD_GLOBAL_RATE, int(config.FWD_GLOBAL_RATE))
 
 _album_buffer = {}
 _album_tasks = {}
 
+# src chat id -> enabled rules; built on first use, rebuilt on rule changes
+_rules_by_src: dict[int, tuple] | None = None
+
 
 __plugin__ = {
     "name": "Forwarder",
@@ -30,6 +47,7 @@ __plugin__ = {
         "fwd list": "List all forwarding rules",
         "fwd on": "Enable a forwarding rule",
         "fwd off": "Disable a forwarding rule",
+        "fwd mode": "Forward with or without the forward header",
     },
 }
 
@@ -68,67 +86,55 @@ def _new_rule_id():
 
 
 # -------------------------------------------------
-# Worker lifecycle
+# Rule helpers
 # -------------------------------------------------
-def start_worker(client):
-    global _forward_queue, _worker_task
+def _rebuild_rule_index():
+    global _rules_by_src
 
-    if _forward_queue:
-        return  # already running
+    index = {}
+    for rid in _rules_index():
+        rule = _load_rule(rid)
+        if rule and rule.get("enabled"):
+            index.setdefault(rule["src"], []).append(rule)
 
-    _forward_queue = asyncio.Queue()
-    _worker_task = asyncio.create_task(_forward_worker(client))
+    _rules_by_src = {src: tuple(rules) for src, rules in index.items()}
 
 
-# -------------------------------------------------
-# Rule helpers
-# -------------------------------------------------
 def get_active_rules_for_chat(chat_id: int):
-    rules = []
-    for rid in _rules_index():
-        rule = _load_rule(rid)
-        if rule and rule.get("enabled") and rule.get("src") == chat_id:
-            rules.append(rule)
-    return rules
+    # Runs for every incoming message: a dict lookup, no DB access
+    if _rules_by_src is None:
+        _rebuild_rule_index()
+    return _rules_by_src.get(chat_id, ())
+
+
+def is_watched(event) -> bool:
+    """
+    Event filter for the incoming hook (NewMessage func=). Telethon drops
+    messages from chats without enabled rules before any handler runs;
+    the watched set is the rule index, so rule changes apply at once.
+    """
+    if _rules_by_src is None:
+        _rebuild_rule_index()
+    return event.chat_id in _rules_by_src
 
 
 # -------------------------------------------------
 # Album handling
 # -------------------------------------------------
-async def _delayed_album_flush(grouped_id, client, dst, delay):
+async def _delayed_album_flush(grouped_id, rules):
     await asyncio.sleep(1.2)
-    await _flush_album(grouped_id, client, dst, delay)
 
-
-async def _flush_album(grouped_id, client, dst, delay):
     messages = _album_buffer.pop(grouped_id, [])
     _album_tasks.pop(grouped_id, None)
 
-    if not messages:
-        return
+    if messages:
+        for rule in rules:
+            enqueue(messages, rule["dst"], _drop_author(rule))
 
-    files = []
-    caption = None
 
-    for msg in messages:
-        if msg.media:
-            files.append(msg.media)
-            if msg.text and not caption:
-                caption = msg.text
-
-    try:
-        if files:
-            await client.send_file(dst, files, caption=caption)
-        elif caption:
-            await client.send_message(dst, caption)
-
-        await asyncio.sleep(delay)
-
-    except FloodWaitError as e:
-        await asyncio.sleep(e.seconds + 1)
-
-    except Exception:
-        pass
+def _drop_author(rule) -> bool:
+    # Rules from before modes existed were always copied
+    return rule.get("mode", "copy") == "copy"
 
 
 # -------------------------------------------------
@@ -142,65 +148,203 @@ async def handle_incoming(event):
     if not rules:
         return
 
-    for rule in rules:
-        dst = rule["dst"]
-        delay = rule.get("delay", 2)
-
-        # Album
-        if message.grouped_id:
-            gid = message.grouped_id
-            _album_buffer.setdefault(gid, []).append(message)
-
-            if gid not in _album_tasks:
-                _album_tasks[gid] = asyncio.create_task(
-                    _delayed_album_flush(gid, event.client, dst, delay)
-                )
-            return
+    # Album: collect its parts, then send them together
+    if message.grouped_id:
+        gid = message.grouped_id
+        _album_buffer.setdefault(gid, []).append(message)
 
-        await enqueue(message, dst, delay)
+        if gid not in _album_tasks:
+            _album_tasks[gid] = asyncio.create_task(
+                _delayed_album_flush(gid, rules)
+            )
+        return
+
+    for rule in rules:
+        enqueue([message], rule["dst"], _drop_author(rule))
 
 
 # -------------------------------------------------
-# Forward worker (SINGLE definition)
+# Sending
 # -------------------------------------------------
-async def _forward_worker(client):
-    while True:
-        message, dst, delay = await _forward_queue.get()
+async def _forward(dst, messages, drop_author: bool):
+    client = messages[0].client
 
-        try:
-            # Text
-            if not message.media:
-                await client.send_message(dst, message.text or "")
+    # One request for the whole batch; all messages share a source
+    await client.forward_messages(dst, messages, drop_author=drop_author)
 
-            # Media
-            else:
-                try:
-                    await client.send_file(
-                        dst,
-                        message.media,
-                        caption=message.text,
-                    )
-                except Exception:
-                    file = await message.download_media()
-                    if file:
-                        await client.send_file(dst, file, caption=message.text)
 
-            await asyncio.sleep(delay)
+def _albums(messages):
+    """
+    Split a batch into single messages and albums, in order.
+    """
+    group = []
+    for msg in messages:
+        if group and (not msg.grouped_id or msg.grouped_id != group[-1].grouped_id):
+            yield group
+            group = []
+        group.append(msg)
+    if group:
+        yield group
+
+
+async def _resend(dst, messages):
+    """
+    Send a message or album again as our own, for sources that do not
+    allow forwarding.
+    """
+    client = messages[0].client
+
+    # Album
+    if len(messages) > 1:
+        files = [msg.media for msg in messages if msg.media]
+        caption = next((msg.text for msg in messages if msg.media and msg.text), None)
 
-        except FloodWaitError as e:
-            await asyncio.sleep(e.seconds + 1)
+        if files:
+            await client.send_file(dst, files, caption=caption)
+        elif caption:
+            await client.send_message(dst, caption)
+        return
+
+    message = messages[0]
+
+    # Text
+    if not message.media:
+        await client.send_message(dst, message.text or "")
+        return
+
+    # Media
+    try:
+        await client.send_file(dst, message.media, caption=message.text)
+    except FloodWaitError:
+        raise
+    except Exception:
+        file = await message.download_media()
+        if file:
+            await client.send_file(dst, file, caption=message.text)
+
+
+# -------------------------------------------------
+# Destination lanes
+# -------------------------------------------------
+class _Lane:
+    """
+    Queue and worker of one destination chat, paced by its own token
+    bucket and the global one. A FloodWait pauses only this lane; the
+    worker exits after FWD_LANE_IDLE seconds without messages.
+    """
+
+    def __init__(self, dst: int):
+        self.dst = dst
+        self.queue = asyncio.Queue()
+        self.bucket = TokenBucket(config.FWD_CHAT_RATE, config.FWD_CHAT_BURST)
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        pending = None  # item that did not fit the previous batch
+        try:
+            while True:
+                if pending:
+                    item, pending = pending, None
+                else:
+                    try:
+                        item = await asyncio.wait_for(
+                            self.queue.get(), config.FWD_LANE_IDLE
+                        )
+                    except asyncio.TimeoutError:
+                        if self.queue.empty():
+                            return
+                        continue
+
+                messages, drop_author = item
+                messages, pending = await self._coalesce(messages, drop_author)
+                await self._deliver(messages, drop_author)
+
+        finally:
+            if _lanes.get(self.dst) is self:
+                del _lanes[self.dst]
+
+    async def _coalesce(self, messages, drop_author):
+        """
+        Add queued messages from the same source and mode, waiting up to
+        FWD_BATCH_WINDOW seconds for more. Returns (batch, first item
+        that did not fit or None).
+        """
+        batch = list(messages)
+        src = batch[0].chat_id
+        deadline = time.monotonic() + config.FWD_BATCH_WINDOW
+
+        while len(batch) < FORWARD_BATCH:
+            try:
+                if self.queue.empty():
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                else:
+                    item = self.queue.get_nowait()
+            except asyncio.TimeoutError:
+                break
+
+            more, mode = item
+            if (
+                mode != drop_author
+                or more[0].chat_id != src
+                or len(batch) + len(more) > FORWARD_BATCH
+            ):
+                return batch, item
+            batch.extend(more)
+
+        return batch, None
+
+    async def _paced(self, send):
+        """
+        Await send() once both buckets have a token; after a FloodWait,
+        wait it out and try again.
+        """
+        while True:
+            await self.bucket.acquire()
+            await _global_bucket.acquire()
+
+            try:
+                return await send()
+
+            except FloodWaitError as e:
+                # Other lanes keep going
+                log.warning(f"Forwarder: flood wait of {e.seconds}s for {self.dst}")
+                self.bucket.pause(e.seconds + 1)
+
+    async def _deliver(self, messages, drop_author):
+        try:
+            # May not be cached yet while dialogs are still warming
+            peer = await warmer.get_input_entity(self.dst)
+            await self._paced(lambda: _forward(peer, messages, drop_author))
+            return
+
+        except ChatForwardsRestrictedError:
+            pass  # protected source: re-send below
 
-        except Exception:
-            pass
+        except Exception as e:
+            log.error(f"Forwarding to {self.dst} failed: {e}")
+            return
+
+        for group in _albums(messages):
+            try:
+                await self._paced(lambda group=group: _resend(peer, group))
+            except Exception as e:
+                log.error(f"Forwarding to {self.dst} failed: {e}")
 
 
 # -------------------------------------------------
 # Queue API
 # -------------------------------------------------
-async def enqueue(message, dst: int, delay: int = 2):
-    if not _forward_queue:
-        return
-    await _forward_queue.put((message, dst, delay))
+def enqueue(messages: list, dst: int, drop_author: bool = True):
+    """
+    Queue messages (one, or the parts of an album) for `dst`.
+    """
+    lane = _lanes.get(dst)
+    if lane is None:
+        lane = _lanes[dst] = _Lane(dst)
+    lane.queue.put_nowait((messages, drop_author))
 
 
 # -------------------------------------------------
@@ -217,127 +361,180 @@ async def _resolve_chat(event, value: str) -> int | None:
 
 
 # -------------------------------------------------
-# Command handler
+# Command handlers
 # -------------------------------------------------
 async def handler(event, args):
-    if not args:
+    if args:
+        return await respond(event, "❌ Unknown subcommand. Use `fwd`.")
+
+    return await respond(
+        event,
+        "🔁 **Forwarder**\n\n"
+        "**Commands:**\n"
+        "• `fwd add <src_id|@src> <dst_id|@dst> [copy|forward]`\n"
+        "• `fwd del <rule_id>`\n"
+        "• `fwd on <rule_id>`\n"
+        "• `fwd off <rule_id>`\n"
+        "• `fwd mode <rule_id> <copy|forward>`\n"
+        "• `fwd list`",
+    )
+
+
+# ---------------- fwd add ----------------
+@command("fwd add")
+async def fwd_add(event, args):
+    if len(args) < 2:
+        return await respond(event, "❌ Usage: `fwd add <src> <dst> [copy|forward]`")
+
+    mode = args[2].lower() if len(args) > 2 else "copy"
+    if mode not in MODES:
+        return await respond(event, "❌ Mode must be `copy` or `forward`.")
+
+    src = await _resolve_chat(event, args[0])
+    dst = await _resolve_chat(event, args[1])
+
+    if not src or not dst:
         return await respond(
             event,
-            "🔁 **Forwarder**\n\n"
-            "**Commands:**\n"
-            "• `fwd add <src_id|@src> <dst_id|@dst>`\n"
-            "• `fwd del <rule_id>`\n"
-            "• `fwd on <rule_id>`\n"
-            "• `fwd off <rule_id>`\n"
-            "• `fwd list`",
+            "❌ Could not resolve source or destination chat.\n"
+            "Make sure the username is valid and you have access.",
         )
 
-    cmd = args[0].lower()
+    rule_id = _new_rule_id()
+    rule = {
+        "src": src,
+        "dst": dst,
+        "enabled": True,
+        "mode": mode,
+    }
+
+    rules = _rules_index()
+    rules.append(rule_id)
+    _save_rules_index(rules)
+    _save_rule(rule_id, rule)
+    _rebuild_rule_index()
+
+    log_event(
+        event="Forwarder",
+        details=(
+            "Rule added\n"
+            f"ID: {rule_id}\n"
+            f"From: {src}\n"
+            f"To: {dst}\n"
+            f"Mode: {mode}"
+        ),
+    )
+
+    return await respond(
+        event,
+        "✅ **Forwarding rule added**\n\n"
+        f"🆔 **ID:** `{rule_id}`\n"
+        f"📥 **From:** `{src}`\n"
+        f"📤 **To:** `{dst}`\n"
+        f"🔀 **Mode:** {mode}\n"
+        "⚙️ **Status:** Enabled",
+    )
+
+
+# ---------------- fwd del ----------------
+@command("fwd del")
+async def fwd_del(event, args):
+    if not args:
+        return await respond(event, "❌ Usage: `fwd del <rule_id>`")
 
-    # ---------------- fwd add ----------------
-    if cmd == "add":
-        if len(args) < 3:
-            return await respond(event, "❌ Usage: `fwd add <src> <dst>`")
+    rule_id = args[0]
+    rules = _rules_index()
 
-        src = await _resolve_chat(event, args[1])
-        dst = await _resolve_chat(event, args[2])
+    if rule_id not in rules:
+        return await respond(event, "❌ Rule not found.")
 
-        if not src or not dst:
-            return await respond(
-                event,
-                "❌ Could not resolve source or destination chat.\n"
-                "Make sure the username is valid and you have access.",
-            )
+    rules.remove(rule_id)
+    _save_rules_index(rules)
+    _delete_rule(rule_id)
+    _rebuild_rule_index()
 
-        rule_id = _new_rule_id()
-        rule = {
-            "src": src,
-            "dst": dst,
-            "enabled": True,
-            "delay": 2,
-        }
-
-        rules = _rules_index()
-        rules.append(rule_id)
-        _save_rules_index(rules)
-        _save_rule(rule_id, rule)
-
-        log_event(
-            event="Forwarder",
-            details=(
-                "Rule added\n"
-                f"ID: {rule_id}\n"
-                f"From: {src}\n"
-                f"To: {dst}"
-            ),
-        )
+    log_event("Forwarder", f"Rule deleted\nID: {rule_id}")
+    return await respond(event, f"🗑 **Rule `{rule_id}` deleted.**")
 
-        return await respond(
-            event,
-            "✅ **Forwarding rule added**\n\n"
-            f"🆔 **ID:** `{rule_id}`\n"
-            f"📥 **From:** `{src}`\n"
-            f"📤 **To:** `{dst}`\n"
-            "⚙️ **Status:** Enabled",
-        )
 
-    # ---------------- fwd del ----------------
-    if cmd == "del":
-        if len(args) < 2:
-            return await respond(event, "❌ Usage: `fwd del <rule_id>`")
+# ---------------- fwd on / off ----------------
+async def _set_enabled(event, args, enabled: bool):
+    cmd = "on" if enabled else "off"
+    if not args:
+        return await respond(event, f"❌ Usage: `fwd {cmd} <rule_id>`")
 
-        rule_id = args[1]
-        rules = _rules_index()
+    rule_id = args[0]
+    rule = _load_rule(rule_id)
 
-        if rule_id not in rules:
-            return await respond(event, "❌ Rule not found.")
+    if not rule:
+        return await respond(event, "❌ Rule not found.")
 
-        rules.remove(rule_id)
-        _save_rules_index(rules)
-        _delete_rule(rule_id)
+    rule["enabled"] = enabled
+    _save_rule(rule_id, rule)
+    _rebuild_rule_index()
 
-        log_event("Forwarder", f"Rule deleted\nID: {rule_id}")
-        return await respond(event, f"🗑 **Rule `{rule_id}` deleted.**")
+    state = "enabled" if enabled else "disabled"
+    return await respond(event, f"⚙️ **Rule `{rule_id}` {state}.**")
 
-    # ---------------- fw on / off ----------------
-    if cmd in ("on", "off"):
-        if len(args) < 2:
-            return await respond(event, f"❌ Usage: `fw {cmd} <rule_id>`")
 
-        rule_id = args[1]
-        rule = _load_rule(rule_id)
+@command("fwd on")
+async def fwd_on(event, args):
+    return await _set_enabled(event, args, True)
 
-        if not rule:
-            return await respond(event, "❌ Rule not found.")
 
-        rule["enabled"] = cmd == "on"
-        _save_rule(rule_id, rule)
+@command("fwd off")
+async def fwd_off(event, args):
+    return await _set_enabled(event, args, False)
 
-        state = "enabled" if cmd == "on" else "disabled"
-        return await respond(event, f"⚙️ **Rule `{rule_id}` {state}.**")
 
-    # ---------------- fwd list ----------------
-    if cmd == "list":
-        rules = _rules_index()
-        if not rules:
-            return await respond(event, "📭 No forwarding rules configured.")
+# ---------------- fwd mode ----------------
+@command("fwd mode")
+async def fwd_mode(event, args):
+    if len(args) < 2 or args[1].lower() not in MODES:
+        return await respond(event, "❌ Usage: `fwd mode <rule_id> <copy|forward>`")
 
-        text = "🔁 **Forwarding Rules**\n\n"
+    rule_id, mode = args[0], args[1].lower()
+    rule = _load_rule(rule_id)
 
-        for rid in rules:
-            rule = _load_rule(rid)
-            if not rule:
-                continue
+    if not rule:
+        return await respond(event, "❌ Rule not found.")
 
-            status = "🟢 ENABLED" if rule["enabled"] else "🔴 DISABLED"
+    rule["mode"] = mode
+    _save_rule(rule_id, rule)
+    _rebuild_rule_index()
 
-            text += (
-                f"🆔 **ID:** `{rid}`\n"
-                f"📥 **From:** `{rule['src']}`\n"
-                f"📤 **To:** `{rule['dst']}`\n"
-                f"⚙️ **Status:** {status}\n\n"
-            )
+    return await respond(event, f"🔀 **Rule `{rule_id}` set to {mode}.**")
+
+
+# ---------------- fwd list ----------------
+@command("fwd list")
+async def fwd_list(event, args):
+    prefix = _rule_key("")
+    text = "🔁 **Forwarding Rules**\n\n"
+    shown = hidden = 0
+
+    # Rule ids are creation timestamps, so key order is creation order
+    async for key, raw in db.iter_prefix(prefix, values=True):
+        rule = json.loads(raw)
+        status = "🟢 ENABLED" if rule["enabled"] else "🔴 DISABLED"
+
+        entry = (
+            f"🆔 **ID:** `{key[len(prefix):]}`\n"
+            f"📥 **From:** `{rule['src']}`\n"
+            f"📤 **To:** `{rule['dst']}`\n"
+            f"🔀 **Mode:** {rule.get('mode', 'copy')}\n"
+            f"⚙️ **Status:** {status}\n\n"
+        )
+        if len(text) + len(entry) > MAX_MESSAGE_LENGTH:
+            hidden += 1
+            continue
+        text += entry
+        shown += 1
+
+    if not shown:
+        return await respond(event, "📭 No forwarding rules configured.")
 
-        return await respond(event, text.strip())
+    if hidden:
+        text += f"… and `{hidden}` more"
 
-    return await respond(event, "❌ Unknown subcommand. Use `fwd`.")
+    return await respond(event, text.strip())
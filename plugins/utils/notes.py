@@ -1,5 +1,6 @@
-from db.core import db
-from utils.respond import respond
+from db import notes as notes_db
+from dispatcher import command
+from utils.respond import respond, MAX_MESSAGE_LENGTH
 from utils.logger import log_event
 
 
@@ -13,155 +14,191 @@ __plugin__ = {
         "note get": "Retrieve a saved note by name",
         "note del": "Delete a saved note",
         "note list": "List all saved notes in the current chat",
+        "note search": "Full-text search notes (-a for all chats)",
     },
 }
 
 
-# -------------------------------------------------
-# Helpers
-# -------------------------------------------------
-def _key(chat_id: int, name: str) -> str:
-    return f"notes:{chat_id}:{name.lower()}"
+SEARCH_RESULTS = 10
 
 
 # -------------------------------------------------
 # Main handler
 # -------------------------------------------------
 async def handler(event, args):
-    if not args:
+    if args:
         return await respond(
             event,
-            "📒 **Notes Module**\n\n"
-            "**Available commands:**\n"
-            "• `note set <name> <text>` — Save a note\n"
-            "• `note get <name>` — Get a saved note\n"
-            "• `note del <name>` — Delete a note\n"
-            "• `note list` — List all notes\n"
+            "❌ Unknown subcommand.\n"
+            "Use `note` to see available options.",
         )
 
-    cmd = args[0].lower()
-    chat_id = event.chat_id
+    return await respond(
+        event,
+        "📒 **Notes Module**\n\n"
+        "**Available commands:**\n"
+        "• `note set <name> <text>` — Save a note\n"
+        "• `note get <name>` — Get a saved note\n"
+        "• `note del <name>` — Delete a note\n"
+        "• `note list` — List all notes\n"
+        "• `note search [-a] <query>` — Search notes\n"
+    )
+
 
-    # -------------------------------------------------
-    # note set <name> <text>
-    # -------------------------------------------------
-    # -------------------------------------------------
+# -------------------------------------------------
 # note set <name> [text]
 # -------------------------------------------------
-    if cmd == "set":
-        if len(args) < 2:
-            return await respond(
-                event,
-                "❌ **Usage:**\n"
-                "`note set <name> <text>`\n"
-                "or reply to a message with:\n"
-                "`note set <name>`",
-            )
-
-        name = args[1]
-
-        reply = await event.get_reply_message()
-        if reply and reply.text:
-            content = reply.text
-        elif len(args) > 2:
-            content = " ".join(args[2:])
-        else:
-            return await respond(
-                event,
-                "❌ No content to save.\n"
-                "Provide text or reply to a message.",
-            )
-
-        db.set(_key(chat_id, name), content)
-
-        log_event(
-            event="NOTE_SET",
-            details=f"Saved note '{name}'",
+@command("note set")
+async def note_set(event, args):
+    if not args:
+        return await respond(
+            event,
+            "❌ **Usage:**\n"
+            "`note set <name> <text>`\n"
+            "or reply to a message with:\n"
+            "`note set <name>`",
         )
 
+    name = args[0]
+
+    reply = await event.get_reply_message()
+    if reply and reply.text:
+        content = reply.text
+    elif len(args) > 1:
+        content = " ".join(args[1:])
+    else:
         return await respond(
             event,
-            f"📝 **Note saved**\n"
-            f"• Name: `{name}`\n"
-            f"• Source: {'reply' if reply else 'text'}",
+            "❌ No content to save.\n"
+            "Provide text or reply to a message.",
         )
 
+    await notes_db.save(event.chat_id, name, content)
 
-    # -------------------------------------------------
-    # note get <name>
-    # -------------------------------------------------
-    if cmd == "get":
-        if len(args) < 2:
-            return await respond(
-                event,
-                "❌ **Usage:** `note get <name>`\n"
-                "Retrieve a previously saved note.",
-            )
+    log_event(
+        event="NOTE_SET",
+        details=f"Saved note '{name}'",
+    )
 
-        name = args[1]
-        note = db.get(_key(chat_id, name))
+    return await respond(
+        event,
+        f"📝 **Note saved**\n"
+        f"• Name: `{name}`\n"
+        f"• Source: {'reply' if reply else 'text'}",
+    )
 
-        if not note:
-            return await respond(event, "❌ Note not found.")
 
+# -------------------------------------------------
+# note get <name>
+# -------------------------------------------------
+@command("note get")
+async def note_get(event, args):
+    if not args:
         return await respond(
             event,
-            f"🗒 **Note: `{name}`**\n\n{note}",
+            "❌ **Usage:** `note get <name>`\n"
+            "Retrieve a previously saved note.",
         )
 
-    # -------------------------------------------------
-    # note del <name>
-    # -------------------------------------------------
-    if cmd == "del":
-        if len(args) < 2:
-            return await respond(
-                event,
-                "❌ **Usage:** `note del <name>`\n"
-                "Delete a saved note.",
-            )
-
-        name = args[1]
-        key = _key(chat_id, name)
+    name = args[0]
+    note = await notes_db.get(event.chat_id, name)
 
-        if not db.get(key):
-            return await respond(event, "❌ Note not found.")
+    if not note:
+        return await respond(event, "❌ Note not found.")
 
-        db.delete(key)
+    return await respond(
+        event,
+        f"🗒 **Note: `{name}`**\n\n{note}",
+    )
 
-        log_event(
-            event="NOTE_DELETE",
-            details=f"Deleted note '{name}'",
-        )
 
+# -------------------------------------------------
+# note del <name>
+# -------------------------------------------------
+@command("note del")
+async def note_del(event, args):
+    if not args:
         return await respond(
             event,
-            f"🗑 **Note deleted**\n"
-            f"• Name: `{name}`",
+            "❌ **Usage:** `note del <name>`\n"
+            "Delete a saved note.",
         )
 
-    # -------------------------------------------------
-    # note list
-    # -------------------------------------------------
-    if cmd == "list":
-        prefix = f"notes:{chat_id}:"
-        keys = db.keys(prefix)
-
-        if not keys:
-            return await respond(event, "📭 No notes saved in this chat.")
+    name = args[0]
 
-        names = sorted(k.split(":")[-1] for k in keys)
-        text = (
-            "📒 **Saved Notes**\n\n"
-            + "\n".join(f"• `{n}`" for n in names)
-        )
+    if not await notes_db.delete(event.chat_id, name):
+        return await respond(event, "❌ Note not found.")
 
-        return await respond(event, text)
+    log_event(
+        event="NOTE_DELETE",
+        details=f"Deleted note '{name}'",
+    )
 
-    # -------------------------------------------------
-    # Unknown subcommand
-    # -------------------------------------------------
     return await respond(
         event,
-        "❌ Unknown subcommand.\n"
-        "Use `note` to see available options.",
+        f"🗑 **Note deleted**\n"
+        f"• Name: `{name}`",
+    )
+
+
+# -------------------------------------------------
+# note list
+# -------------------------------------------------
+@command("note list")
+async def note_list(event, args):
+    text = "📒 **Saved Notes**\n\n"
+    shown = hidden = 0
+
+    async for name in notes_db.iter_names(event.chat_id):
+        line = f"• `{name}`\n"
+        if len(text) + len(line) > MAX_MESSAGE_LENGTH:
+            hidden += 1
+            continue
+        text += line
+        shown += 1
+
+    if not shown:
+        return await respond(event, "📭 No notes saved in this chat.")
+
+    if hidden:
+        text += f"\n… and `{hidden}` more"
+
+    return await respond(event, text.strip())
+
+
+# -------------------------------------------------
+# note search [-a] <query>
+# -------------------------------------------------
+@command("note search")
+async def note_search(event, args):
+    everywhere = bool(args) and args[0] in ("-a", "--all")
+    if everywhere:
+        args = args[1:]
+
+    if not args:
+        return await respond(
+            event,
+            "❌ **Usage:** `note search [-a] <query>`\n"
+            "Search notes in this chat, or in all chats with `-a`.",
+        )
+
+    query = " ".join(args)
+    results = await notes_db.search(
+        query,
+        chat_id=None if everywhere else event.chat_id,
+        limit=SEARCH_RESULTS,
     )
+
+    if not results:
+        return await respond(event, f"🔍 No notes match `{query}`.")
+
+    text = f"🔍 **Notes matching** `{query}`\n\n"
+    for result in results:
+        where = f" (`{result['chat_id']}`)" if everywhere else ""
+        snippet = " ".join(result["snippet"].split())
+        line = f"• `{result['name']}`{where}\n  {snippet}\n"
+        if len(text) + len(line) > MAX_MESSAGE_LENGTH:
+            break
+        text += line
+
+    return await respond(event, text.strip())
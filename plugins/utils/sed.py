@@ -91,5 +91,5 @@ async def raw_handler(event):
     return True  # handled
 
 
-# Register raw handler
-dispatcher.register_raw(raw_handler)
\ No newline at end of file
+# Register raw handler (only sed-looking messages reach it)
+dispatcher.register_raw(raw_handler, trigger=SED_REGEX)
\ No newline at end of file
@@ -138,7 +138,7 @@ async def _handle_fetch(event, args):
 # Main handler
 # -------------------------------------------------
 async def handler(event, args):
-    cmd = event.raw_text.split()[0].lstrip("./").lower()
+    cmd = event.command
 
     if cmd == "dl":
         return await _handle_dl(event)
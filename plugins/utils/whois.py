@@ -133,7 +133,7 @@ def format_chat_whois(chat, full):
 # Handler
 # -------------------------------------------------
 async def handler(event, args):
-    cmd = event.raw_text.split()[0].lstrip("./").lower()
+    cmd = event.command
 
     # Resolve entity
     reply = await event.get_reply_message()
@@ -1,6 +1,5 @@
 from telethon.errors import YouBlockedUserError
 
-from dispatcher import dispatcher
 from utils.respond import respond
 from utils.logger import log_event
 
@@ -23,6 +22,10 @@ __plugin__ = {
         "models": "Get device models",
         "whatis": "Get device name from codename",
     },
+    # Bot conversations should never hang a command slot
+    "limits": {
+        "*": {"timeout": 30},
+    },
 }
 
 XIAOMI_BOT = "XiaomiGeeksBot"
@@ -77,7 +80,7 @@ async def handler(event, args):
     if not args:
         return await respond(event, "Usage: .<command> <codename>")
 
-    cmd = event.raw_text.lstrip("./").split()[0].lower()
+    cmd = event.command
     codename = args[0]
 
     # fw is userbot alias → bot MUST get /firmware
@@ -109,20 +112,3 @@ async def handler(event, args):
             f"Fetching {cmd} info…",
         )
 
-
-# -------------------------------------------------
-# Register commands
-# -------------------------------------------------
-
-dispatcher.register("fw", handler)
-dispatcher.register("vendor", handler)
-dispatcher.register("specs", handler)
-dispatcher.register("fastboot", handler)
-dispatcher.register("recovery", handler)
-dispatcher.register("of", handler)
-dispatcher.register("latest", handler)
-dispatcher.register("archive", handler)
-dispatcher.register("eu", handler)
-dispatcher.register("twrp", handler)
-dispatcher.register("models", handler)
-dispatcher.register("whatis", handler)
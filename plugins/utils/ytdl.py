@@ -16,6 +16,10 @@ __plugin__ = {
         "ytv": "Download YouTube video",
         "yta": "Download YouTube audio",
     },
+    # Long downloads are expected
+    "limits": {
+        "*": {"timeout": 1800},
+    },
 }
 
 DOWNLOAD_DIR = "downloads"
@@ -126,7 +130,7 @@ async def handler(event, args):
     msg = None
 
     try:
-        cmd = event.raw_text.lstrip("./").split()[0].lower()
+        cmd = event.command
         audio = cmd == "yta"
         query = " ".join(args)
 
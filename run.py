@@ -9,7 +9,9 @@ from dispatcher import dispatcher
 from loader import loader
 
 from utils.logger import log, clear_logs, setup as setup_logging, log_event
-from plugins.utils.forwarder import start_worker, handle_incoming
+from utils.profiler import profiler
+from utils.entities import warmer
+from plugins.utils.forwarder import handle_incoming, is_watched
 
 from db.control import (
     get_pending,
@@ -44,7 +46,7 @@ async def reconcile_control_state() -> bool:
         return False
 
     try:
-        entity = await client.get_input_entity(row["chat_id"])
+        entity = await warmer.get_input_entity(row["chat_id"])
         await client.edit_message(
             entity,
             row["message_id"],
@@ -87,11 +89,13 @@ async def main():
         details="Fresh startup, restart, or update",
     )
 
-    apikeys.init()
+    with profiler.phase("apikeys.init"):
+        apikeys.init()
     version, codename = get_version()
 
     try:
-        await clients.start()
+        with profiler.phase("clients.start"):
+            await clients.start()
     except RuntimeError as e:
         log.error(str(e))
         print("\nRun `python gensession.py` first.\n")
@@ -101,21 +105,25 @@ async def main():
     if clients.bot:
         setup_logging(clients.bot)
 
-    # User account needs dialogs for entity resolution
+    # User account needs dialogs for entity resolution; warm them in
+    # the background so commands work right away
     if clients.user:
-        await clients.user.get_dialogs()
+        warmer.start(clients.user)
 
     dispatcher.bind(clients.user, clients.bot)
 
     # -------------------------------------------------
     # Load plugins
     # -------------------------------------------------
-    loader.load()
+    with profiler.phase("loader.load"):
+        loader.load()
 
-    if clients.user:
-        start_worker(clients.user)
+    if config.PLUGIN_WATCH:
+        loader.start_watcher(config.PLUGIN_WATCH_INTERVAL)
 
-        @clients.user.on(NewMessage(incoming=True))
+    if clients.user:
+        # Only chats that are a rule source reach the handler
+        @clients.user.on(NewMessage(incoming=True, func=is_watched))
         async def forwarder_incoming_handler(event):
             await handle_incoming(event)
 
@@ -124,7 +132,10 @@ async def main():
     # -------------------------------------------------
     # Reconcile restart/update AFTER everything is ready
     # -------------------------------------------------
-    was_controlled = await reconcile_control_state()
+    with profiler.phase("reconcile"):
+        was_controlled = await reconcile_control_state()
+
+    profiler.finish()
 
     if not was_controlled:
         log_event(
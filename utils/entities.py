@@ -0,0 +1,154 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+
+from telethon.errors import FloodWaitError
+
+from config import config
+from db.core import db
+from utils.logger import log
+from utils.profiler import profiler
+
+
+CHECKPOINT_KEY = "dialogs:checkpoint"
+
+# Telethon fetches dialogs 100 per request
+DIALOG_PAGE = 100
+
+
+# -------------------------------------------------
+# Background entity cache warming
+# -------------------------------------------------
+class EntityWarmer:
+    """
+    Fills the userbot's entity cache from its dialog list in the
+    background instead of blocking startup on get_dialogs().
+
+    Dialogs arrive newest first. The date of the newest one is kept as a
+    checkpoint, so later boots stop at dialogs not touched since; older
+    ones are only scanned when a lookup misses (get_input_entity).
+    """
+
+    def __init__(self):
+        self.client = None
+        self.ready = asyncio.Event()
+        self.warmed = 0
+        self._task = None
+        self._resume = None  # date where a checkpointed scan stopped
+        self._lock = asyncio.Lock()  # one dialog scan at a time
+
+    def start(self, client):
+        if self._task:
+            return  # already running
+
+        self.client = client
+        self._task = asyncio.create_task(self._warm())
+
+    async def _warm(self):
+        checkpoint = db.get(CHECKPOINT_KEY)
+        until = (
+            datetime.fromtimestamp(float(checkpoint), timezone.utc)
+            if checkpoint
+            else None
+        )
+        start = time.perf_counter()
+
+        try:
+            with profiler.phase("dialogs.warm"):
+                async with self._lock:
+                    newest, self._resume, _ = await self._scan(until=until)
+
+            if newest:
+                db.set(CHECKPOINT_KEY, newest.timestamp())
+
+            log.info(
+                f"Warmed {self.warmed} dialogs in "
+                f"{time.perf_counter() - start:.1f}s "
+                f"({'since checkpoint' if until else 'full'})"
+            )
+
+        except Exception as e:
+            log.error(f"Dialog warming failed: {e}")
+
+        finally:
+            self.ready.set()
+
+    async def _scan(self, offset_date=None, until=None, want=None):
+        """
+        Page through dialogs from offset_date (newest first), pausing
+        between pages. Stops at the first unpinned dialog older than
+        `until` or once peer id `want` is seen.
+
+        Returns (newest date, date to resume from or None, found).
+        """
+        newest = None
+        last = offset_date
+        seen = 0
+
+        while True:
+            try:
+                async for dialog in self.client.iter_dialogs(offset_date=last):
+                    date = dialog.date
+                    if newest is None:
+                        newest = date
+
+                    if until and date and date < until and not dialog.pinned:
+                        return newest, date, False
+
+                    if date:
+                        last = date
+                    self.warmed += 1
+                    seen += 1
+
+                    if dialog.id == want:
+                        return newest, last, True
+
+                    if seen % DIALOG_PAGE == 0:
+                        await asyncio.sleep(config.DIALOG_WARM_DELAY)
+
+                return newest, None, False
+
+            except FloodWaitError as e:
+                # Resume from the last dialog seen once the wait is over
+                log.warning(f"Dialog warming hit a flood wait of {e.seconds}s")
+                await asyncio.sleep(e.seconds + 1)
+
+    # -------------------------------------------------
+    # On-demand lookups
+    # -------------------------------------------------
+    async def get_input_entity(self, peer):
+        """
+        client.get_input_entity() that waits for warming or scans
+        older dialogs when the peer is not cached yet.
+        """
+        client = self.client
+        try:
+            return await client.get_input_entity(peer)
+        except ValueError:
+            if not isinstance(peer, int):
+                raise
+
+        if not self.ready.is_set():
+            try:
+                await asyncio.wait_for(self.ready.wait(), config.DIALOG_WAIT)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                return await client.get_input_entity(peer)
+            except ValueError:
+                pass
+
+        async with self._lock:
+            if self._resume:
+                _, self._resume, _ = await self._scan(
+                    offset_date=self._resume,
+                    want=peer,
+                )
+
+        return await client.get_input_entity(peer)
+
+    async def get_entity(self, peer):
+        return await self.client.get_entity(await self.get_input_entity(peer))
+
+
+warmer = EntityWarmer()
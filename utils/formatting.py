@@ -13,3 +13,9 @@ def human_time(seconds: int) -> str:
     parts.append(f"{seconds}s")
 
     return " ".join(parts)
+
+
+def human_ms(ms: float) -> str:
+    if ms >= 1000:
+        return f"{ms / 1000:.1f}s"
+    return f"{ms:.0f}ms"
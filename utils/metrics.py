@@ -0,0 +1,166 @@
+import time
+
+
+# Upper bounds in milliseconds; the last bucket catches everything else
+BUCKETS_MS = (
+    1, 2, 5, 10, 25, 50, 100, 250, 500,
+    1000, 2500, 5000, 10000, 30000, 60000,
+)
+
+
+# -------------------------------------------------
+# Fixed-bucket histogram
+# -------------------------------------------------
+class Histogram:
+    __slots__ = ("counts", "total", "sum_ms", "max_ms")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float):
+        index = len(BUCKETS_MS)
+        for i, bound in enumerate(BUCKETS_MS):
+            if ms <= bound:
+                index = i
+                break
+
+        self.counts[index] += 1
+        self.total += 1
+        self.sum_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q: float) -> float:
+        """
+        Upper bound of the bucket holding the q-th percentile
+        (the max observed value for the overflow bucket).
+        """
+        if not self.total:
+            return 0.0
+
+        rank = q * self.total
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                if i < len(BUCKETS_MS):
+                    return float(min(BUCKETS_MS[i], self.max_ms))
+                return self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.total,
+            "sum_ms": round(self.sum_ms, 3),
+            "max_ms": round(self.max_ms, 3),
+            "p50": round(self.percentile(0.50), 3),
+            "p95": round(self.percentile(0.95), 3),
+            "p99": round(self.percentile(0.99), 3),
+            "buckets": dict(
+                zip([*map(str, BUCKETS_MS), "inf"], self.counts)
+            ),
+        }
+
+
+class CommandStats:
+    __slots__ = ("wall", "loop", "errors", "timeouts")
+
+    def __init__(self):
+        self.wall = Histogram()
+        self.loop = Histogram()
+        self.errors = 0
+        self.timeouts = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "wall": self.wall.to_dict(),
+            "loop": self.loop.to_dict(),
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+        }
+
+
+# -------------------------------------------------
+# Event-loop time of a coroutine
+# -------------------------------------------------
+class LoopTimer:
+    """
+    Await wrapper that drives a coroutine step by step and sums the time
+    spent inside each step, i.e. the time it held the event loop.
+    """
+
+    __slots__ = ("coro", "busy")
+
+    def __init__(self, coro):
+        self.coro = coro
+        self.busy = 0.0
+
+    def __await__(self):
+        coro = self.coro
+        value, error = None, None
+
+        while True:
+            start = time.perf_counter()
+            try:
+                if error is not None:
+                    future = coro.throw(error)
+                else:
+                    future = coro.send(value)
+            except StopIteration as e:
+                self.busy += time.perf_counter() - start
+                return e.value
+            except BaseException:
+                self.busy += time.perf_counter() - start
+                raise
+            self.busy += time.perf_counter() - start
+
+            try:
+                value, error = (yield future), None
+            except BaseException as e:
+                value, error = None, e
+
+
+# -------------------------------------------------
+# Registry
+# -------------------------------------------------
+class Metrics:
+    def __init__(self):
+        self.commands = {}  # command path -> CommandStats
+        self.since = time.time()
+
+    def record(
+        self,
+        command: str,
+        wall: float,
+        loop: float,
+        error: bool = False,
+        timeout: bool = False,
+    ):
+        stats = self.commands.get(command)
+        if stats is None:
+            stats = self.commands[command] = CommandStats()
+
+        stats.wall.observe(wall * 1000)
+        stats.loop.observe(loop * 1000)
+        if error:
+            stats.errors += 1
+        if timeout:
+            stats.timeouts += 1
+
+    def reset(self):
+        self.commands.clear()
+        self.since = time.time()
+
+    def to_dict(self) -> dict:
+        return {
+            "since": self.since,
+            "commands": {
+                name: stats.to_dict()
+                for name, stats in sorted(self.commands.items())
+            },
+        }
+
+
+metrics = Metrics()
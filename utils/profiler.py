@@ -0,0 +1,118 @@
+import time
+from contextlib import contextmanager
+
+from config import config
+from db import profile as store
+from utils.logger import log, log_event
+
+
+# -------------------------------------------------
+# Startup profiler
+# -------------------------------------------------
+class StartupProfiler:
+    """
+    Times startup phases and every plugin's import and init().
+    finish() stores the boot in the startup_profile table; plugins
+    imported later (lazy ones) are stored as they happen. Reloads are
+    kept apart (kind "reload") so they never replace boot-time costs.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.entries = {}  # (kind, name) -> ms
+        self.boot_id = None
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record([("phase", name, time.perf_counter() - start)])
+
+    def plugin(
+        self,
+        module_name: str,
+        import_s: float,
+        init_s: float | None,
+        reload: bool = False,
+    ):
+        if reload:
+            self._record([("reload", module_name, import_s + (init_s or 0))])
+            return
+
+        entries = [("import", module_name, import_s)]
+        if init_s is not None:
+            entries.append(("init", module_name, init_s))
+        self._record(entries)
+
+        # During boot the over-budget ones are reported together by finish()
+        if self.boot_id is not None:
+            slow = self.over_budget({module_name: import_s + (init_s or 0)})
+            if slow:
+                self._flag(slow)
+
+    def _record(self, entries):
+        entries = [(kind, name, s * 1000) for kind, name, s in entries]
+        for kind, name, ms in entries:
+            self.entries[(kind, name)] = ms
+
+        if self.boot_id is not None:
+            store.save(self.boot_id, entries)
+
+    # -------------------------------------------------
+    # Budget
+    # -------------------------------------------------
+    def over_budget(self, costs: dict) -> dict:
+        budget = config.PLUGIN_LOAD_BUDGET_MS
+        if budget <= 0:
+            return {}
+        return {
+            name: s * 1000 for name, s in costs.items() if s * 1000 > budget
+        }
+
+    def _flag(self, slow: dict):
+        log_event(
+            event="Slow plugin load",
+            details="\n".join(
+                f"{name}: {ms:.0f} ms (budget {config.PLUGIN_LOAD_BUDGET_MS} ms)"
+                for name, ms in sorted(slow.items(), key=lambda i: -i[1])
+            ),
+        )
+
+    # -------------------------------------------------
+    # Persist (end of startup)
+    # -------------------------------------------------
+    def finish(self):
+        if self.boot_id is not None:
+            return
+
+        self.entries[("phase", "total")] = (time.perf_counter() - self.started) * 1000
+
+        try:
+            self.boot_id = store.next_boot_id()
+            store.save(
+                self.boot_id,
+                ((kind, name, ms) for (kind, name), ms in self.entries.items()),
+            )
+            store.prune()
+        except Exception as e:
+            log.error(f"Failed to save startup profile: {e}")
+            return
+
+        costs = {}
+        for (kind, name), ms in self.entries.items():
+            if kind in ("import", "init"):
+                costs[name] = costs.get(name, 0) + ms / 1000
+
+        slow = self.over_budget(costs)
+        if slow:
+            self._flag(slow)
+
+        log.info(
+            f"Startup took {self.entries[('phase', 'total')]:.0f} ms "
+            f"(boot #{self.boot_id})"
+        )
+
+
+profiler = StartupProfiler()
@@ -0,0 +1,120 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+
+class RateLimiter:
+    """
+    Token bucket per key with bounded memory.
+
+    Each key may send `limit` messages per `window` seconds; a key that
+    runs dry is ignored for `ignore` seconds. Idle keys are swept after
+    their bucket would have refilled, and at most `max_keys` are tracked
+    (least recently seen keys are evicted first).
+    """
+
+    SWEEP_INTERVAL = 60
+
+    def __init__(self, limit: int, window: int, ignore: int, max_keys: int = 10000):
+        self.limit = limit
+        self.window = window
+        self.ignore = ignore
+        self.max_keys = max_keys
+        self.rate = limit / window if window else 0
+
+        # key -> [tokens, last_seen, ignored_until]
+        self._buckets = OrderedDict()
+        self._next_sweep = time.monotonic() + self.SWEEP_INTERVAL
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def hit(self, key) -> bool:
+        """
+        Register one message from `key`. Returns True if it is limited.
+        """
+        if self.limit <= 0:
+            return False
+
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self.sweep(now)
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(self.limit), now, 0.0]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+
+        if bucket[2] > now:
+            return True
+
+        bucket[0] = min(self.limit, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+
+        if bucket[0] < 1:
+            bucket[2] = now + self.ignore
+            return True
+
+        bucket[0] -= 1
+        return False
+
+    def sweep(self, now: float | None = None):
+        """
+        Drop keys whose bucket is full again and whose ignore has expired.
+        """
+        now = time.monotonic() if now is None else now
+        self._next_sweep = now + self.SWEEP_INTERVAL
+
+        expired = [
+            key
+            for key, (_, last, until) in self._buckets.items()
+            if until <= now and now - last >= self.window
+        ]
+        for key in expired:
+            del self._buckets[key]
+
+
+class TokenBucket:
+    """
+    Async token bucket for pacing outgoing requests: acquire() waits
+    for a token instead of rejecting. Refills `rate` tokens per second
+    up to `burst`; rate <= 0 disables it.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def pause(self, seconds: float):
+        """
+        Hand out no tokens for `seconds` (e.g. after a FloodWait).
+        """
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+        # Refill from the end of the pause, not across it
+        self.updated = self.paused_until
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+
+        while True:
+            now = time.monotonic()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+
+            await asyncio.sleep((1 - self.tokens) / self.rate)
@@ -1,3 +1,8 @@
+# Telegram caps messages at 4096 characters; long listings stop here
+# and leave room for an "… and N more" line
+MAX_MESSAGE_LENGTH = 3900
+
+
 async def respond(event, text: str):
     """
     Edit for userbot, reply for bot.